@@ -12,6 +12,20 @@ def main():
     ap.add_argument("--input_csv", type=Path, required=True)
     ap.add_argument("--output_csv", type=Path, required=True)
     ap.add_argument("--fill_missing", type=float, default=0.0)
+    ap.add_argument("--stage2_mode", choices=["batch", "row"], default="batch",
+                    help="batch: 1 predict por especialista (padrão) | row: linha a linha (estudos de latência)")
+    ap.add_argument("--mode", choices=["predict", "benchmark"], default="predict",
+                    help="predict: produção, sem chamadas repetidas (padrão) | benchmark: warm-up + repetições e relatório de latência")
+    ap.add_argument("--benchmark_json", type=Path, default=None,
+                    help="(benchmark) onde salvar o relatório de latência (padrão: <output_csv>.latency.json)")
+    ap.add_argument("--chunk_size", type=int, default=None,
+                    help="streaming: processa o input_csv em blocos de N linhas (memória limitada)")
+    ap.add_argument("--passthrough_cols", type=str, default=None,
+                    help="colunas extras copiadas p/ a saída, separadas por vírgula (ex.: label)")
+    ap.add_argument("--keep_all_columns", action="store_true",
+                    help="lê e devolve todas as colunas do input (desativa a projeção de colunas)")
+    ap.add_argument("--n_workers", type=int, default=1,
+                    help="threads para rodar os lotes de especialistas (por classe) em paralelo")
     args = ap.parse_args()
 
     cfg = TwoStageConfig(
@@ -20,10 +34,17 @@ def main():
         specialist_map_json=str(args.specialist_map),
         input_csv=str(args.input_csv),
         output_csv=str(args.output_csv),
-        fill_missing=args.fill_missing
+        fill_missing=args.fill_missing,
+        stage2_mode=args.stage2_mode,
+        mode=args.mode,
+        benchmark_json=str(args.benchmark_json) if args.benchmark_json else None,
+        chunk_size=args.chunk_size,
+        passthrough_cols=[c.strip() for c in args.passthrough_cols.split(",") if c.strip()] if args.passthrough_cols else None,
+        keep_all_columns=args.keep_all_columns,
+        n_workers=args.n_workers
     )
-    inf = TwoStageInferencer(cfg)
-    gk_ms, s2_ms, tot_ms = inf.predict_csv()
+    with TwoStageInferencer(cfg) as inf:
+        gk_ms, s2_ms, tot_ms = inf.predict_csv()
     logger.info(f"OK — {gk_ms:.3f} / {s2_ms:.3f} / {tot_ms:.3f} ms")
 
 if __name__ == "__main__":
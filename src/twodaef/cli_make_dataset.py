@@ -0,0 +1,22 @@
+import argparse
+from pathlib import Path
+from loguru import logger
+
+from twodaef.utils.dataset import build_dataset
+
+def main():
+    ap = argparse.ArgumentParser(description="Converter CSV de treino em dataset colunar float32 (memmap) para os CLIs de treino.")
+    ap.add_argument("--csv", type=Path, required=True, help="CSV de treino (ex.: data/train_cic.csv).")
+    ap.add_argument("--target_col", type=str, required=True)
+    ap.add_argument("--out_dir", type=Path, required=True, help="Diretório de saída (X.npy, y.npy, meta.json).")
+    ap.add_argument("--chunksize", type=int, default=200_000, help="linhas por bloco na leitura do CSV")
+    args = ap.parse_args()
+
+    meta = build_dataset(args.csv, args.target_col, args.out_dir, chunksize=args.chunksize)
+    dropped = meta["dropped_columns"]
+    if dropped["non_numeric"] or dropped["non_finite"]:
+        logger.info(f"Colunas descartadas: não numéricas={dropped['non_numeric']} | com inf/NaN={dropped['non_finite']}")
+    logger.info(f"Classes: {meta['classes']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,93 @@
 import argparse
 from pathlib import Path
 import json
+import numpy as np
 import pandas as pd
 from loguru import logger
 
 from twodaef.features.pools import PoolConfig, build_feature_pool
+from twodaef.utils.dataset import ColumnarDataset, is_dataset
 
 def main():
     ap = argparse.ArgumentParser(description="Gerar pool de feature sets (PSO/GWO/FFA-like).")
-    ap.add_argument("--csv", type=Path, required=True, help="CSV de amostra (ex.: um chunk de CIC-IDS-2018).")
+    ap.add_argument("--csv", type=Path, required=True, help="CSV de amostra (ex.: um chunk de CIC-IDS-2018) ou diretório do make-dataset.")
     ap.add_argument("--target_col", type=str, required=True, help="Nome da coluna alvo.")
     ap.add_argument("--max_features_per_set", type=int, default=20)
     ap.add_argument("--total_sets", type=int, default=30)
     ap.add_argument("--seed", type=int, default=42)
     ap.add_argument("--feature_costs", type=Path, default=None, help="(Opcional) arquivo feature,cost")
+    ap.add_argument("--mi_backend", choices=["knn", "hist"], default="knn",
+                    help="knn: mutual_info_classif | hist: MI por histograma (contagens bin x classe, vetorizado)")
+    ap.add_argument("--mi_bins", type=int, default=64, help="(hist) bins de mesma frequência por coluna")
+    ap.add_argument("--mi_sample", type=int, default=None, help="subamostra estratificada de linhas para o MI")
+    ap.add_argument("--mi_n_jobs", type=int, default=1, help="(hist) blocos de colunas em paralelo")
+    ap.add_argument("--candidates_per_step", type=int, default=1,
+                    help="candidatos avaliados por passo dos geradores PSO/GWO/FFA (fica o de maior fitness)")
+    ap.add_argument("--generator", choices=["mi", "wrapper"], default="mi",
+                    help="mi: recombinação guiada por MI | wrapper: PSO/GWO/FFA binários com modelo substituto")
+    ap.add_argument("--wrapper_model", choices=["tree", "hgb"], default="tree",
+                    help="(wrapper) substituto: árvore rasa ou HistGradientBoosting curto")
+    ap.add_argument("--wrapper_sample", type=int, default=20000, help="(wrapper) linhas da subamostra estratificada")
+    ap.add_argument("--wrapper_population", type=int, default=16)
+    ap.add_argument("--wrapper_iters", type=int, default=30)
+    ap.add_argument("--wrapper_time_budget_s", type=float, default=120.0,
+                    help="(wrapper) orçamento total de tempo em segundos (dividido entre PSO/GWO/FFA)")
+    ap.add_argument("--wrapper_n_jobs", type=int, default=1, help="(wrapper) avaliações da população em paralelo")
+    ap.add_argument("--fitness", choices=["mi_sum", "mrmr"], default="mi_sum",
+                    help="mi_sum: soma do MI | mrmr: relevância - lambda x redundância (penaliza quase-cópias e poda sets)")
+    ap.add_argument("--redundancy", choices=["corr", "mi"], default="corr",
+                    help="(mrmr) dependência feature x feature: |Spearman| ou MI normalizado")
+    ap.add_argument("--redundancy_sample", type=int, default=50000, help="(mrmr) linhas usadas na matriz")
+    ap.add_argument("--redundancy_cache", type=Path, default=None,
+                    help="(mrmr) .npz da matriz (padrão: ao lado do --out_json, <nome>.redundancy.npz)")
+    ap.add_argument("--mrmr_lambda", type=float, default=1.0)
+    ap.add_argument("--mrmr_min_gain", type=float, default=0.05,
+                    help="(mrmr) poda features de ganho marginal abaixo disso; negativo desliga a poda")
+    ap.add_argument("--jaccard_max", type=float, default=None,
+                    help="descarta sets com similaridade de Jaccard >= limite com outro já mantido (completa total_sets)")
     ap.add_argument("--out_json", type=Path, default=Path("artifacts/feature_pool.json"))
     args = ap.parse_args()
 
-    df = pd.read_csv(args.csv)
-    if args.target_col not in df.columns:
-        logger.error(f"Coluna alvo '{args.target_col}' não encontrada no CSV.")
-        raise SystemExit(2)
+    y = None
+    if is_dataset(args.csv):
+        ds = ColumnarDataset(args.csv)
+        if ds.target_col != args.target_col:
+            logger.error(f"Dataset {args.csv} foi gerado com target_col '{ds.target_col}'.")
+            raise SystemExit(2)
+        df, y = ds.frame(), np.asarray(ds.y)
+    else:
+        df = pd.read_csv(args.csv)
+        if args.target_col not in df.columns:
+            logger.error(f"Coluna alvo '{args.target_col}' não encontrada no CSV.")
+            raise SystemExit(2)
 
     cfg = PoolConfig(
         target_col=args.target_col,
         max_features_per_set=args.max_features_per_set,
         total_sets=args.total_sets,
         seed=args.seed,
-        feature_costs_path=str(args.feature_costs) if args.feature_costs else None
+        feature_costs_path=str(args.feature_costs) if args.feature_costs else None,
+        mi_backend=args.mi_backend,
+        mi_bins=args.mi_bins,
+        mi_sample=args.mi_sample,
+        mi_n_jobs=args.mi_n_jobs,
+        candidates_per_step=args.candidates_per_step,
+        generator=args.generator,
+        wrapper_model=args.wrapper_model,
+        wrapper_sample=args.wrapper_sample,
+        wrapper_population=args.wrapper_population,
+        wrapper_iters=args.wrapper_iters,
+        wrapper_time_budget_s=args.wrapper_time_budget_s,
+        wrapper_n_jobs=args.wrapper_n_jobs,
+        fitness=args.fitness,
+        redundancy=args.redundancy,
+        redundancy_sample=args.redundancy_sample,
+        redundancy_cache=str(args.redundancy_cache or args.out_json.with_suffix(".redundancy.npz")),
+        mrmr_lambda=args.mrmr_lambda,
+        mrmr_min_gain=args.mrmr_min_gain if args.mrmr_min_gain >= 0 else None,
+        jaccard_max=args.jaccard_max
     )
-    result = build_feature_pool(df, cfg)
+    result = build_feature_pool(df, cfg, y)
 
     args.out_json.parent.mkdir(parents=True, exist_ok=True)
     with open(args.out_json, "w", encoding="utf-8") as f:
@@ -37,6 +95,7 @@ def main():
 
     logger.success(f"Pool gerado: {args.out_json}")
     logger.info(f"Top-10 MI: {result['mi_top10']}")
+    logger.info(f"Sets: {result['dedup']}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,46 @@
+import argparse
+from pathlib import Path
+from loguru import logger
+
+from twodaef.infer.two_stage import TwoStageConfig, TwoStageInferencer
+from twodaef.serve.app import ServeConfig, create_app
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor HTTP de inferência 2 estágios (micro-batching dinâmico).")
+    ap.add_argument("--gatekeeper_model", type=Path, required=True)
+    ap.add_argument("--gatekeeper_features", type=Path, required=True, help="arquivo .txt com uma feature por linha")
+    ap.add_argument("--specialist_map", type=Path, required=True)
+    ap.add_argument("--gatekeeper_labelmap", type=Path, default=None, help="(opcional) JSON saída do GK -> chave do especialista")
+    ap.add_argument("--fill_missing", type=float, default=0.0)
+    ap.add_argument("--n_workers", type=int, default=1, help="threads para os lotes de especialistas em paralelo")
+    ap.add_argument("--host", type=str, default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--max_batch_size", type=int, default=1024, help="teto de fluxos por micro-lote")
+    ap.add_argument("--max_wait_ms", type=float, default=2.0, help="janela de coalescência (ms)")
+    ap.add_argument("--stats_window", type=int, default=10000, help="amostras recentes usadas nos percentis de /stats")
+    args = ap.parse_args()
+
+    import uvicorn
+
+    cfg = TwoStageConfig(
+        gatekeeper_model=str(args.gatekeeper_model),
+        gatekeeper_features_file=str(args.gatekeeper_features),
+        specialist_map_json=str(args.specialist_map),
+        fill_missing=args.fill_missing,
+        n_workers=args.n_workers,
+        gatekeeper_labelmap_json=str(args.gatekeeper_labelmap) if args.gatekeeper_labelmap else None
+    )
+    inf = TwoStageInferencer(cfg)
+    app = create_app(inf, ServeConfig(
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        stats_window=args.stats_window
+    ))
+    logger.info(f"Servindo em http://{args.host}:{args.port} (POST /predict, GET /stats, GET /health)")
+    try:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    finally:
+        inf.close()  # idempotente: o lifespan do app já encerra no shutdown normal
+
+if __name__ == "__main__":
+    main()
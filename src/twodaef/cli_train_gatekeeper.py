@@ -4,6 +4,8 @@ import pandas as pd
 from loguru import logger
 from twodaef.gatekeeper import GatekeeperModel, GatekeeperConfig
 from twodaef.utils.io import ensure_dir, save_joblib
+from twodaef.utils.dataset import ColumnarDataset, is_dataset
+from twodaef.utils.sampling import stratified_sample_csvs
 
 def read_feature_list(path: Path) -> list[str]:
     cols = []
@@ -16,27 +18,55 @@ def read_feature_list(path: Path) -> list[str]:
 
 def main():
     parser = argparse.ArgumentParser(description="Treinar Gatekeeper (Decision Tree podada).")
-    parser.add_argument("--train_csv", type=Path, required=True)
+    parser.add_argument("--train_csv", type=Path, nargs="+", required=True,
+                        help="CSV(s) de treino ou diretório do make-dataset.")
     parser.add_argument("--target_col", type=str, required=True)
     parser.add_argument("--features", type=Path, required=True, help="Arquivo texto com features (uma por linha).")
     parser.add_argument("--model_out", type=Path, default=Path("artifacts/gatekeeper.joblib"))
     parser.add_argument("--max_depth", type=int, default=6)
     parser.add_argument("--min_samples_leaf", type=int, default=10)
+    parser.add_argument("--per_class_quota", type=int, default=None,
+                        help="amostragem estratificada em streaming (reservatório) com até N linhas por classe; "
+                             "lê os CSVs em blocos, sem carregá-los inteiros")
+    parser.add_argument("--chunksize", type=int, default=200_000, help="(com --per_class_quota) linhas por bloco")
+    parser.add_argument("--seed", type=int, default=42)
     args = parser.parse_args()
 
-    df = pd.read_csv(args.train_csv)
     feat_list = read_feature_list(args.features)
-    missing = [c for c in feat_list if c not in df.columns]
-    if missing:
-        logger.error(f"Features ausentes no CSV: {missing}")
+    if args.per_class_quota:
+        # memória limitada: quota x n_features por classe, independente do tamanho do corpus
+        X, y, stats = stratified_sample_csvs(
+            args.train_csv, args.target_col, feat_list, args.per_class_quota, args.chunksize, args.seed
+        )
+        for cls in sorted(stats["seen"], key=str):
+            logger.info(f"Classe {cls!r}: vistas={stats['seen'][cls]} | mantidas={stats['kept'][cls]}")
+    elif len(args.train_csv) > 1:
+        logger.error("Vários --train_csv exigem --per_class_quota (amostragem em streaming).")
         raise SystemExit(2)
+    elif is_dataset(args.train_csv[0]):
+        # dataset colunar: lê só as colunas do Gatekeeper (float32, memmap)
+        ds = ColumnarDataset(args.train_csv[0])
+        missing = [c for c in feat_list if c not in ds.columns]
+        if missing:
+            logger.error(f"Features ausentes no dataset: {missing}")
+            raise SystemExit(2)
+        X = ds.frame(feat_list)
+        y = pd.Series(ds.labels(), name=ds.target_col)
+    else:
+        df = pd.read_csv(args.train_csv[0])
+        missing = [c for c in feat_list if c not in df.columns]
+        if missing:
+            logger.error(f"Features ausentes no CSV: {missing}")
+            raise SystemExit(2)
 
-    X = df[feat_list]
-    y = df[args.target_col]
+        X = df[feat_list]
+        y = df[args.target_col]
 
-    cfg = GatekeeperConfig(max_depth=args.max_depth, min_samples_leaf=args.min_samples_leaf)
+    cfg = GatekeeperConfig(max_depth=args.max_depth, min_samples_leaf=args.min_samples_leaf, random_state=args.seed)
     model = GatekeeperModel(cfg)
     metrics = model.fit(X, y)
+    if args.per_class_quota:
+        model.train_sample_ = stats  # contagens vistas/mantidas por classe (rastreabilidade)
     logger.info(f"F1-macro (val): {metrics['f1_macro']:.4f}")
     logger.info("\n" + metrics["report"])
 
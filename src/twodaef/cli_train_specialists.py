@@ -6,7 +6,7 @@ from twodaef.specialists.train_specialists import TrainConfig, train_specialists
 
 def main():
     ap = argparse.ArgumentParser(description="Treinar Matriz de Especialistas (2D-AEF).")
-    ap.add_argument("--train_csv", type=Path, required=True)
+    ap.add_argument("--train_csv", type=Path, required=True, help="CSV de treino ou diretório do make-dataset.")
     ap.add_argument("--target_col", type=str, required=True)
     ap.add_argument("--feature_pool_json", type=Path, required=True)
     ap.add_argument("--out_dir", type=Path, default=Path("artifacts/specialists"))
@@ -15,8 +15,27 @@ def main():
     ap.add_argument("--seed", type=int, default=42)
     ap.add_argument("--models", type=str, default="auto", help="auto ou lista separada por vírgula (ex: lgbm,xgb,sk_hgb,sk_rf)")
     ap.add_argument("--max_features_per_set", type=int, default=None)
+    ap.add_argument("--search", choices=["full", "halving"], default="full",
+                    help="full: todos os candidatos no treino completo | halving: successive halving em amostras crescentes")
+    ap.add_argument("--halving_min_samples", type=int, default=2000, help="(halving) amostra da 1ª rodada")
+    ap.add_argument("--halving_eta", type=int, default=3, help="(halving) fator de corte/crescimento por rodada")
+    ap.add_argument("--n_jobs", type=int, default=1, help="processos para avaliar candidatos em paralelo (1 = serial)")
+    ap.add_argument("--cache_dir", type=Path, default=None,
+                    help="cache persistente de avaliações de candidatos (ex.: artifacts/cache/specialists)")
+    ap.add_argument("--cache_models", action="store_true", help="guarda no cache o modelo final de cada especialista (re-execuções reaproveitam sem re-treinar)")
+    ap.add_argument("--cache_max_mb", type=float, default=2048.0, help="tamanho máximo do cache (MB); excedente sai por LRU")
+    ap.add_argument("--cache_max_age_days", type=float, default=30.0, help="entradas mais antigas que isso são removidas")
+    ap.add_argument("--profile_batch_sizes", type=str, default="none",
+                    help="perfil de latência (p50/p99, com warm-up) dos candidatos da frente de Pareto, "
+                         "em série após a busca (ex.: 1,32,1024,full); 'none' desliga")
+    ap.add_argument("--profile_repeats", type=int, default=30, help="chamadas cronometradas por tamanho de lote")
+    ap.add_argument("--early_stopping_rounds", type=int, default=None,
+                    help="boosters (lgbm/xgb/cat): early stopping na validação; o nº de árvores é reusado no re-treino final")
+    ap.add_argument("--search_bins", type=int, default=None,
+                    help="busca numa matriz pré-binada (ex.: 255 => uint8); o re-treino final usa as features originais")
     args = ap.parse_args()
 
+    profile = [] if args.profile_batch_sizes.lower() == "none" else [b.strip() for b in args.profile_batch_sizes.split(",") if b.strip()]
     models_list = None if args.models == "auto" else [m.strip() for m in args.models.split(",") if m.strip()]
 
     cfg = TrainConfig(
@@ -28,7 +47,19 @@ def main():
         test_size=args.test_size,
         seed=args.seed,
         models=models_list,
-        max_features_per_set=args.max_features_per_set
+        max_features_per_set=args.max_features_per_set,
+        n_jobs=args.n_jobs,
+        search=args.search,
+        halving_min_samples=args.halving_min_samples,
+        halving_eta=args.halving_eta,
+        cache_dir=str(args.cache_dir) if args.cache_dir else None,
+        cache_models=args.cache_models,
+        cache_max_mb=args.cache_max_mb,
+        cache_max_age_days=args.cache_max_age_days,
+        profile_batch_sizes=profile,
+        profile_repeats=args.profile_repeats,
+        early_stopping_rounds=args.early_stopping_rounds,
+        search_bins=args.search_bins
     )
     res = train_specialists(cfg)
     logger.info(f"Resumo: {res.get('specialists', {})}")
@@ -1,15 +1,26 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from pathlib import Path
+from typing import Callable, List, Dict, Any, Tuple
+import hashlib
 import math
-import random
+import time
 
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from loguru import logger
+from scipy.stats import rankdata
+from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.feature_selection import mutual_info_classif
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
+from sklearn.tree import DecisionTreeClassifier
 
 from twodaef.features.costs import load_feature_costs, estimate_set_cost
+from twodaef.utils.binning import quantile_edges
+from twodaef.utils.sampling import stratified_subsample
 
 @dataclass
 class PoolConfig:
@@ -22,8 +33,39 @@ class PoolConfig:
     ratio_gwo: float = 0.33
     ratio_ffa: float = 0.33
     feature_costs_path: str | None = None
+    # ranking de MI: "knn" (mutual_info_classif) | "hist" (contagens conjuntas classe x bin, vetorizado)
+    mi_backend: str = "knn"
+    mi_bins: int = 64                  # (hist) bins de mesma frequência por coluna
+    mi_sample: int | None = None       # subamostra estratificada de linhas para o MI (None => todas)
+    mi_n_jobs: int = 1                 # (hist) blocos de colunas em paralelo
+    candidates_per_step: int = 1       # candidatos avaliados por passo dos geradores (fica o de maior fitness)
+    # geradores: "mi" (recombinação guiada pelo ranking de MI) | "wrapper" (PSO/GWO/FFA binários
+    # com fitness = F1-macro de um modelo substituto barato numa subamostra estratificada)
+    generator: str = "mi"
+    wrapper_model: str = "tree"        # "tree" (árvore rasa) | "hgb" (HistGradientBoosting curto)
+    wrapper_sample: int = 20000        # linhas da subamostra estratificada (cacheada) do substituto
+    wrapper_population: int = 16
+    wrapper_iters: int = 30
+    wrapper_time_budget_s: float = 120.0  # orçamento total de tempo (dividido entre as famílias)
+    wrapper_n_jobs: int = 1            # avaliação da população em paralelo (threads)
+    wrapper_size_penalty: float = 0.01 # fitness = F1 - penalidade * |S| / max_features_per_set
+    # fitness dos geradores "mi": "mi_sum" (soma do MI) | "mrmr" (relevância descontada pela redundância)
+    fitness: str = "mi_sum"
+    redundancy: str = "corr"           # dependência feature x feature: "corr" (|Spearman|) | "mi" (MI normalizado)
+    redundancy_sample: int = 50000     # linhas (estratificadas) usadas na matriz
+    redundancy_bins: int = 32          # (mi) bins de mesma frequência por coluna
+    redundancy_cache: str | None = None  # .npz da matriz (reaproveitado se dados/método batem)
+    mrmr_lambda: float = 1.0
+    mrmr_min_gain: float | None = 0.05 # poda features com ganho mRMR marginal abaixo disso (None => sem poda)
+    # sets repetidos (mesmas features, qualquer ordem) sempre viram um só, com a proveniência;
+    # jaccard_max descarta também quase-duplicatas (similaridade >= limite) e completa total_sets
+    jaccard_max: float | None = None
+    topup_rounds: int = 8              # rodadas extras dos geradores para completar total_sets
 
-def _score_features_mi(df: pd.DataFrame, target_col: str) -> pd.Series:
+def _score_features_mi(df: pd.DataFrame, target_col: str, cfg: PoolConfig | None = None) -> pd.Series:
+    return _mi_rank(*_prepare_xy(df, target_col), cfg)
+
+def _prepare_xy(df: pd.DataFrame, target_col: str) -> Tuple[pd.DataFrame, np.ndarray]:
     y_raw = df[target_col].values
     le = LabelEncoder()
     y = le.fit_transform(y_raw)
@@ -35,169 +77,620 @@ def _score_features_mi(df: pd.DataFrame, target_col: str) -> pd.Series:
     X = X.select_dtypes(include=[np.number]).copy()
     # remove colunas com NaN/Inf
     X = X.replace([np.inf, -np.inf], np.nan).dropna(axis=1, how="any")
+    return X, y
+
+def _mi_hist_block(X: np.ndarray, y: np.ndarray, n_classes: int, n_bins: int) -> np.ndarray:
+    """MI (nats) de cada coluna de X com y, a partir da tabela de contagens conjunta bin x classe."""
+    n, m = X.shape
+    codes = np.empty((n, m), dtype=np.int64)
+    for j in range(m):
+        codes[:, j] = np.searchsorted(quantile_edges(X[:, j], n_bins), X[:, j], side="right")
+    # um único bincount para o bloco: índice = (coluna, bin, classe)
+    flat = (np.arange(m, dtype=np.int64) * (n_bins * n_classes))[None, :] + codes * n_classes + y[:, None]
+    p = np.bincount(flat.ravel(), minlength=m * n_bins * n_classes).reshape(m, n_bins, n_classes) / n
+    pb = p.sum(axis=2, keepdims=True)
+    pc = p.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(p > 0, p * np.log(p / (pb * pc)), 0.0)
+    return terms.sum(axis=(1, 2))
+
+def _mi_hist(X: np.ndarray, y: np.ndarray, n_bins: int = 64, n_jobs: int = 1) -> np.ndarray:
+    """
+    Estimador de MI por histograma: cada coluna é quantizada em `n_bins` bins de mesma frequência
+    e o MI sai das contagens conjuntas bin x classe. Colunas em blocos (memória ~ n x bloco),
+    opcionalmente em paralelo (threads).
+    """
+    y = np.asarray(y, dtype=np.int64)
+    n_classes = int(y.max()) + 1
+    step = max(1, 4_000_000 // max(1, X.shape[0]))
+    blocks = [(j, min(j + step, X.shape[1])) for j in range(0, X.shape[1], step)]
+    parts = Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(_mi_hist_block)(X[:, a:b], y, n_classes, n_bins) for a, b in blocks
+    )
+    return np.concatenate(parts) if parts else np.empty(0)
+
+def _mi_rank(X: pd.DataFrame, y: np.ndarray, cfg: PoolConfig | None = None) -> pd.Series:
     sel_cols = X.columns.tolist()
     if not sel_cols:
         raise ValueError("Nenhuma coluna numérica disponível após limpeza.")
-    mi = mutual_info_classif(X[sel_cols], y, discrete_features=False, random_state=0)
+    backend = cfg.mi_backend if cfg else "knn"
+    if cfg and cfg.mi_sample and cfg.mi_sample < len(y):
+        idx = stratified_subsample(y, cfg.mi_sample, cfg.seed)
+        X, y = X.iloc[idx], y[idx]
+    if backend == "hist":
+        mi = _mi_hist(X[sel_cols].to_numpy(dtype=np.float64), y, cfg.mi_bins, cfg.mi_n_jobs)
+    elif backend == "knn":
+        mi = mutual_info_classif(X[sel_cols], y, discrete_features=False, random_state=0)
+    else:
+        raise ValueError(f"mi_backend inválido: {backend!r} (use 'knn' ou 'hist').")
     return pd.Series(mi, index=sel_cols).sort_values(ascending=False)
 
-def _clip_set(s: List[str], k: int) -> List[str]:
+# Feature sets são arrays de índices (int) sobre o universo ordenado por MI (índice 0 = maior MI);
+# o fitness é um gather-sum vetorizado sobre o vetor de MI normalizado, pré-computado 1x.
+Fitness = Callable[[np.ndarray], float]
+
+def _mi_fitness(mi_rank: pd.Series) -> Fitness:
+    # fitness simples = soma da MI normalizada das features no set
+    mi = mi_rank.to_numpy(dtype=np.float64)
+    denom = float(mi.max()) if mi.size and mi.max() > 0 else 1.0
+    w = mi / denom
+    return lambda idx: float(w[idx].sum())
+
+def _clip_set(idx: np.ndarray, k: int) -> np.ndarray:
     # limita tamanho e remove duplicatas preservando ordem
-    seen = set()
-    out = []
-    for f in s:
-        if f in seen:
-            continue
-        seen.add(f)
-        out.append(f)
-        if len(out) >= k:
-            break
-    return out
+    _, first = np.unique(idx, return_index=True)
+    return idx[np.sort(first)][:k]
 
-def _random_subset(candidates: List[str], k: int) -> List[str]:
+def _random_subset(rng: np.random.Generator, n_universe: int, k: int) -> np.ndarray:
     if k <= 0:
-        return []
-    if len(candidates) <= k:
-        return candidates[:]
-    return random.sample(candidates, k)
-
-def _local_mutation(feats: List[str], universe: List[str], k: int, p_swap: float = 0.3) -> List[str]:
-    feats = feats[:]
-    for i in range(len(feats)):
-        if random.random() < p_swap:
-            # troca por uma feature aleatória que não esteja no conjunto
-            cand = random.choice(universe)
-            tries = 0
-            while cand in feats and tries < 5:
-                cand = random.choice(universe)
-                tries += 1
-            feats[i] = cand
-    return _clip_set(feats, k)
-
-def _fitness_mi(feats: List[str], mi_rank: pd.Series) -> float:
-    # fitness simples = soma da MI normalizada das features no set
-    if not feats:
-        return 0.0
-    s = 0.0
-    denom = float(mi_rank.max()) if mi_rank.max() > 0 else 1.0
-    for f in feats:
-        if f in mi_rank.index:
-            s += float(mi_rank[f]) / denom
-    return s
-
-def _make_pso_like(mi_rank: pd.Series, k: int, n_sets: int, seed: int) -> List[List[str]]:
-    random.seed(seed + 17)
-    universe = mi_rank.index.tolist()
-    sets: List[List[str]] = []
+        return np.empty(0, dtype=np.intp)
+    return rng.choice(n_universe, size=min(k, n_universe), replace=False)
+
+def _local_mutation(
+    rng: np.random.Generator, idx: np.ndarray, n_universe: int, k: int, p_swap: float = 0.3
+) -> np.ndarray:
+    idx = idx.copy()
+    member = np.zeros(n_universe, dtype=bool)  # pertinência O(1) em vez de `in` linear
+    member[idx] = True
+    swaps = np.flatnonzero(rng.random(idx.size) < p_swap)
+    # troca por uma feature aleatória que não esteja no conjunto (até 6 sorteios, sorteados de uma vez)
+    all_draws = rng.integers(0, n_universe, size=(swaps.size, 6))
+    for i, draws in zip(swaps, all_draws):
+        free = draws[~member[draws]]
+        cand = free[0] if free.size else draws[-1]
+        member[idx[i]] = False
+        member[cand] = True
+        idx[i] = cand
+    return _clip_set(idx, k)
+
+def _best_of(cands: List[np.ndarray], fitness: Fitness) -> np.ndarray:
+    # vários candidatos por passo: fica o de maior fitness
+    if len(cands) == 1:
+        return cands[0]
+    return cands[int(np.argmax([fitness(c) for c in cands]))]
+
+def _make_pso_like(
+    n_universe: int, k: int, n_sets: int, seed: int, fitness: Fitness, candidates_per_step: int = 1
+) -> List[np.ndarray]:
+    rng = np.random.default_rng(seed + 17)
+    sets: List[np.ndarray] = []
     # partícula inicial: top-k
-    gbest = universe[:k]
+    gbest = np.arange(min(k, n_universe))
     sets.append(gbest)
     # iterações curtas para gerar diversidade
     for _ in range(n_sets - 1):
-        # "inércia": mantem parte do gbest e muta o resto
-        keep = random.randint(max(1, k // 3), max(2, k // 2))
-        candidate = _clip_set(gbest[:keep] + _random_subset(universe, k - keep), k)
-        # pequena mutação
-        candidate = _local_mutation(candidate, universe, k, p_swap=0.2)
+        cands = []
+        for _ in range(candidates_per_step):
+            # "inércia": mantem parte do gbest e muta o resto
+            keep = int(rng.integers(max(1, k // 3), max(2, k // 2) + 1))
+            cand = _clip_set(np.concatenate([gbest[:keep], _random_subset(rng, n_universe, k - keep)]), k)
+            # pequena mutação
+            cands.append(_local_mutation(rng, cand, n_universe, k, p_swap=0.2))
+        candidate = _best_of(cands, fitness)
         # se novo conjunto tem melhor fitness, atualiza gbest
-        if _fitness_mi(candidate, mi_rank) > _fitness_mi(gbest, mi_rank):
+        if fitness(candidate) > fitness(gbest):
             gbest = candidate
         sets.append(candidate)
     return sets
 
-def _make_gwo_like(mi_rank: pd.Series, k: int, n_sets: int, seed: int) -> List[List[str]]:
-    random.seed(seed + 31)
-    universe = mi_rank.index.tolist()
-    sets: List[List[str]] = []
+def _make_gwo_like(
+    n_universe: int, k: int, n_sets: int, seed: int, fitness: Fitness, candidates_per_step: int = 1
+) -> List[np.ndarray]:
+    rng = np.random.default_rng(seed + 31)
+    sets: List[np.ndarray] = []
     # alpha/beta/delta iniciais: top-k, mid-k, random-k
-    alpha = universe[:k]
-    mid_start = max(0, len(universe)//3)
-    beta = universe[mid_start:mid_start + k]
-    delta = _random_subset(universe, k)
+    alpha = np.arange(min(k, n_universe))
+    mid_start = max(0, n_universe // 3)
+    beta = np.arange(mid_start, min(mid_start + k, n_universe))
+    delta = _random_subset(rng, n_universe, k)
     sets.extend([alpha, beta, delta])
     while len(sets) < n_sets:
-        # recombinar alpha/beta/delta com pesos
-        w = [0.5, 0.3, 0.2]
-        pool = []
-        for src, weight in zip([alpha, beta, delta], w):
-            take = max(1, int(math.ceil(weight * k)))
-            pool.extend(src[:take])
-        candidate = _clip_set(pool + _random_subset(universe, k), k)
-        candidate = _local_mutation(candidate, universe, k, p_swap=0.25)
+        cands = []
+        for _ in range(candidates_per_step):
+            # recombinar alpha/beta/delta com pesos
+            w = [0.5, 0.3, 0.2]
+            pool = [src[:max(1, int(math.ceil(weight * k)))] for src, weight in zip([alpha, beta, delta], w)]
+            cand = _clip_set(np.concatenate(pool + [_random_subset(rng, n_universe, k)]), k)
+            cands.append(_local_mutation(rng, cand, n_universe, k, p_swap=0.25))
+        candidate = _best_of(cands, fitness)
         # atualizar alpha/beta/delta se candidatos forem melhores
-        if _fitness_mi(candidate, mi_rank) > _fitness_mi(alpha, mi_rank):
+        f = fitness(candidate)
+        if f > fitness(alpha):
             alpha, beta, delta = candidate, alpha, beta
-        elif _fitness_mi(candidate, mi_rank) > _fitness_mi(beta, mi_rank):
+        elif f > fitness(beta):
             beta, delta = candidate, beta
         else:
             delta = candidate
         sets.append(candidate)
     return sets[:n_sets]
 
-def _make_ffa_like(mi_rank: pd.Series, k: int, n_sets: int, seed: int) -> List[List[str]]:
-    random.seed(seed + 59)
-    universe = mi_rank.index.tolist()
+def _make_ffa_like(
+    n_universe: int, k: int, n_sets: int, seed: int, fitness: Fitness, candidates_per_step: int = 1
+) -> List[np.ndarray]:
+    rng = np.random.default_rng(seed + 59)
     # inicializa com alguns conjuntos aleatórios + top-k
-    population = [universe[:k]] + [_random_subset(universe, k) for _ in range(max(2, n_sets // 3))]
-    def brightness(s: List[str]) -> float:
-        return _fitness_mi(s, mi_rank)
+    population = [np.arange(min(k, n_universe))] + [
+        _random_subset(rng, n_universe, k) for _ in range(max(2, n_sets // 3))
+    ]
+    brightness = [fitness(s) for s in population]
     while len(population) < n_sets:
-        # escolhe dois, “atrai” o pior pelo melhor
-        a, b = random.sample(population, 2)
-        best, worst = (a, b) if brightness(a) >= brightness(b) else (b, a)
-        # atrai: troca algumas features do pior por features do melhor
-        merged = _clip_set(worst[:], k)
-        for i in range(max(1, k // 4)):
-            if i < len(best) and i < len(merged):
-                merged[i] = best[i]
-        merged = _local_mutation(merged, universe, k, p_swap=0.15)
+        cands = []
+        for _ in range(candidates_per_step):
+            # escolhe dois, “atrai” o pior pelo melhor
+            a, b = rng.choice(len(population), size=2, replace=False)
+            best, worst = (a, b) if brightness[a] >= brightness[b] else (b, a)
+            # atrai: troca algumas features do pior por features do melhor
+            merged = population[worst][:k].copy()
+            m = min(max(1, k // 4), population[best].size, merged.size)
+            merged[:m] = population[best][:m]
+            cands.append(_local_mutation(rng, _clip_set(merged, k), n_universe, k, p_swap=0.15))
+        merged = _best_of(cands, fitness)
         population.append(merged)
+        brightness.append(fitness(merged))
     return population[:n_sets]
 
+# ---------- Redundância (mRMR) ----------
+def _redundancy_corr(X: np.ndarray) -> np.ndarray:
+    # |Spearman| = |Pearson| dos ranks; colunas constantes => 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        R = np.abs(np.corrcoef(rankdata(X, axis=0), rowvar=False))
+    return np.nan_to_num(np.atleast_2d(R), nan=0.0)
+
+def _redundancy_mi(X: np.ndarray, n_bins: int = 32) -> np.ndarray:
+    """MI normalizado I(i;j)/sqrt(H(i)H(j)) entre colunas quantizadas; uma bincount por coluna i (j >= i)."""
+    n, m = X.shape
+    codes = np.empty((n, m), dtype=np.int64)
+    for j in range(m):
+        codes[:, j] = np.searchsorted(quantile_edges(X[:, j], n_bins), X[:, j], side="right")
+    R = np.zeros((m, m), dtype=np.float64)
+    for i in range(m):
+        rest = codes[:, i:]
+        w = rest.shape[1]
+        flat = (np.arange(w, dtype=np.int64) * (n_bins * n_bins))[None, :] + codes[:, [i]] * n_bins + rest
+        p = np.bincount(flat.ravel(), minlength=w * n_bins * n_bins).reshape(w, n_bins, n_bins) / n
+        pa = p.sum(axis=2, keepdims=True)
+        pb = p.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mi = np.where(p > 0, p * np.log(p / (pa * pb)), 0.0).sum(axis=(1, 2))
+            hb = -np.where(pb > 0, pb * np.log(pb), 0.0).sum(axis=(1, 2))
+        R[i, i:] = mi
+        R[i:, i] = mi
+        if i == 0:
+            h = hb  # entropias de todas as colunas (diagonal de I)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        R = R / np.sqrt(np.outer(h, h))
+    return np.clip(np.nan_to_num(R, nan=0.0), 0.0, 1.0)
+
+def redundancy_matrix(
+    X: pd.DataFrame, y: np.ndarray, cfg: PoolConfig
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Matriz de dependência feature x feature (colunas de X, valores em [0, 1]) numa subamostra
+    estratificada, calculada 1x e persistida em `cfg.redundancy_cache` (.npz); a chave inclui
+    método, bins e o hash dos dados amostrados, então outro CSV/amostra recalcula.
+    """
+    if cfg.redundancy not in {"corr", "mi"}:
+        raise ValueError(f"redundancy inválido: {cfg.redundancy!r} (use 'corr' ou 'mi').")
+    idx = np.arange(len(y))
+    if cfg.redundancy_sample and cfg.redundancy_sample < len(y):
+        idx = stratified_subsample(np.asarray(y), cfg.redundancy_sample, cfg.seed)
+    Xs = np.ascontiguousarray(X.iloc[idx].to_numpy(dtype=np.float64))
+    h = hashlib.sha256()
+    h.update(f"{cfg.redundancy}|{cfg.redundancy_bins}|".encode("utf-8"))
+    h.update("\x1f".join(map(str, X.columns)).encode("utf-8"))
+    h.update(Xs.tobytes())
+    key = h.hexdigest()
+    info: Dict[str, Any] = {"method": cfg.redundancy, "path": cfg.redundancy_cache, "cached": False}
+
+    path = Path(cfg.redundancy_cache) if cfg.redundancy_cache else None
+    if path is not None and path.exists():
+        with np.load(path, allow_pickle=False) as z:
+            if str(z["key"]) == key:
+                info["cached"] = True
+                return z["matrix"], info
+        logger.info(f"Matriz de redundância em {path} é de outros dados/método; recalculando.")
+
+    t0 = time.perf_counter()
+    R = _redundancy_corr(Xs) if cfg.redundancy == "corr" else _redundancy_mi(Xs, cfg.redundancy_bins)
+    np.fill_diagonal(R, 1.0)
+    logger.info(f"Matriz de redundância ({cfg.redundancy}, {R.shape[0]}x{R.shape[0]}) em {time.perf_counter() - t0:.1f}s")
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, key=np.asarray(key), columns=np.asarray(X.columns, dtype=str), matrix=R)
+    return R, info
+
+# mRMR com redundância = dependência máxima com outra feature do set: a média dilui as
+# cópias num set de 20 features; o máximo zera o valor de uma quase-cópia.
+def _mrmr_fitness(mi_rank: pd.Series, R: np.ndarray, lam: float) -> Fitness:
+    # soma de relevância_i x (1 - lambda x max_j R_ij), com MI normalizado pelo topo
+    mi = mi_rank.to_numpy(dtype=np.float64)
+    denom = float(mi.max()) if mi.size and mi.max() > 0 else 1.0
+    w = mi / denom
+
+    def fit(idx: np.ndarray) -> float:
+        if idx.size < 2:
+            return float(w[idx].sum())
+        sub = R[np.ix_(idx, idx)].copy()
+        np.fill_diagonal(sub, 0.0)
+        return float((w[idx] * (1.0 - lam * sub.max(axis=1))).sum())
+    return fit
+
+def _mrmr_prune(idx: np.ndarray, w: np.ndarray, R: np.ndarray, lam: float, min_gain: float) -> np.ndarray:
+    """Seleção gulosa mRMR dentro do set: para quando o melhor ganho marginal fica abaixo de `min_gain`."""
+    rest = list(idx[np.argsort(-w[idx], kind="stable")])
+    chosen = [rest.pop(0)]
+    while rest:
+        gains = w[rest] * (1.0 - lam * R[np.ix_(rest, chosen)].max(axis=1))
+        b = int(np.argmax(gains))
+        if gains[b] < min_gain:
+            break
+        chosen.append(rest.pop(b))
+    return np.asarray(chosen, dtype=np.intp)
+
+# ---------- Busca wrapper (binária) com avaliador substituto ----------
+class SurrogateEvaluator:
+    """
+    Avaliador barato de feature sets: treina um modelo pequeno (árvore rasa ou HGB curto) numa
+    subamostra estratificada fixa (treino/validação separados 1x) e devolve o F1-macro da validação.
+    Scores ficam em cache por conjunto (índices ordenados); a população é avaliada em paralelo.
+    """
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, model: str = "tree", seed: int = 42, n_jobs: int = 1):
+        if model not in {"tree", "hgb"}:
+            raise ValueError(f"wrapper_model inválido: {model!r} (use 'tree' ou 'hgb').")
+        try:
+            split = train_test_split(X, y, test_size=0.3, random_state=seed, stratify=y)
+        except ValueError:  # classe com 1 amostra na subamostra
+            split = train_test_split(X, y, test_size=0.3, random_state=seed)
+        X_tr, X_va, self.y_tr, self.y_va = split
+        self.X_tr = np.asfortranarray(X_tr)  # recorte de colunas barato
+        self.X_va = np.asfortranarray(X_va)
+        self.model = model
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.cache: Dict[Tuple[int, ...], float] = {}
+
+    def _fit_score(self, key: Tuple[int, ...]) -> float:
+        cols = np.asarray(key, dtype=np.intp)
+        if self.model == "tree":
+            clf = DecisionTreeClassifier(max_depth=8, min_samples_leaf=5, random_state=self.seed)
+        else:
+            clf = HistGradientBoostingClassifier(max_iter=30, max_leaf_nodes=15, early_stopping=False, random_state=self.seed)
+        clf.fit(self.X_tr[:, cols], self.y_tr)
+        return float(f1_score(self.y_va, clf.predict(self.X_va[:, cols]), average="macro"))
+
+    def score(self, sets: List[np.ndarray]) -> np.ndarray:
+        keys = [tuple(sorted(int(i) for i in st)) for st in sets]
+        todo = [key for key in dict.fromkeys(keys) if key and key not in self.cache]
+        if todo:
+            vals = Parallel(n_jobs=self.n_jobs, prefer="threads")(delayed(self._fit_score)(key) for key in todo)
+            self.cache.update(zip(todo, vals))
+        return np.asarray([self.cache.get(key, 0.0) for key in keys], dtype=np.float64)
+
+
+def _repair(bits: np.ndarray, k: int) -> np.ndarray:
+    """Restringe cada linha a 1..k bits: excedentes saem pelo fim do ranking de MI; vazio => top-1."""
+    bits = bits & (np.cumsum(bits, axis=1) <= k)
+    bits[~bits.any(axis=1), 0] = True
+    return bits
+
+def _sigmoid(v: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-v))
+
+class _WrapperRun:
+    """Estado comum das buscas binárias: fitness com penalidade de tamanho + arquivo de conjuntos vistos."""
+
+    def __init__(self, ev: SurrogateEvaluator, n: int, k: int, pop: int, rng: np.random.Generator, penalty: float):
+        self.ev, self.n, self.k, self.pop, self.rng, self.penalty = ev, n, k, pop, rng, penalty
+        self.archive: Dict[Tuple[int, ...], float] = {}
+
+    def init(self) -> np.ndarray:
+        # top-k do MI + bits aleatórios com ~k/2 features esperadas
+        bits = self.rng.random((self.pop, self.n)) < min(0.5, self.k / (2.0 * self.n))
+        bits[0] = np.arange(self.n) < self.k
+        return _repair(bits, self.k)
+
+    def fitness(self, bits: np.ndarray) -> np.ndarray:
+        sets = [np.flatnonzero(row) for row in bits]
+        f = self.ev.score(sets) - self.penalty * bits.sum(axis=1) / max(1, self.k)
+        for st, v in zip(sets, f):
+            self.archive[tuple(int(i) for i in st)] = float(v)
+        return f
+
+    def best_sets(self, n_sets: int) -> List[np.ndarray]:
+        ranked = sorted(self.archive.items(), key=lambda kv: -kv[1])[:n_sets]
+        return [np.asarray(key, dtype=np.intp) for key, _ in ranked]
+
+def _wrapper_pso(run: _WrapperRun, iters: int, deadline: float) -> None:
+    """PSO binário (Kennedy & Eberhart): velocidade real, posição = Bernoulli(sigmoid(v))."""
+    X = run.init()
+    V = run.rng.uniform(-1.0, 1.0, X.shape)
+    f = run.fitness(X)
+    pbest, pf = X.copy(), f.copy()
+    for it in range(iters):
+        if time.perf_counter() > deadline:
+            break
+        w = 0.9 - 0.5 * it / max(1, iters - 1)
+        g = pbest[int(np.argmax(pf))]
+        r1, r2 = run.rng.random((2, *X.shape))
+        Xf = X.astype(np.float64)
+        V = np.clip(w * V + 2.0 * r1 * (pbest - Xf) + 2.0 * r2 * (g - Xf), -4.0, 4.0)
+        X = _repair(run.rng.random(X.shape) < _sigmoid(V), run.k)
+        f = run.fitness(X)
+        better = f > pf
+        pbest[better], pf[better] = X[better], f[better]
+
+def _wrapper_gwo(run: _WrapperRun, iters: int, deadline: float) -> None:
+    """GWO binário: média das posições guiadas por alpha/beta/delta, binarizada por sigmoide."""
+    X = run.init()
+    f = run.fitness(X)
+    leaders = [(X[i].copy(), f[i]) for i in np.argsort(-f)[:3]]
+    for it in range(iters):
+        if time.perf_counter() > deadline:
+            break
+        a = 2.0 - 2.0 * it / max(1, iters)
+        Xf = X.astype(np.float64)
+        acc = np.zeros_like(Xf)
+        for L, _ in leaders:
+            r1, r2 = run.rng.random((2, *X.shape))
+            A, C = 2.0 * a * r1 - a, 2.0 * r2
+            acc += L - A * np.abs(C * L - Xf)
+        X = _repair(run.rng.random(X.shape) < _sigmoid(10.0 * (acc / len(leaders) - 0.5)), run.k)
+        f = run.fitness(X)
+        # líderes = 3 melhores já vistos (elitismo)
+        pool = leaders + [(X[i].copy(), f[i]) for i in range(len(f))]
+        leaders = sorted(pool, key=lambda t: -t[1])[:3]
+
+def _wrapper_ffa(run: _WrapperRun, iters: int, deadline: float) -> None:
+    """Firefly binário: cada vagalume se move para os mais brilhantes (atração ~ exp(-gamma r^2))."""
+    X = run.init()
+    f = run.fitness(X)
+    beta0, gamma, alpha = 1.0, 1.0, 0.2
+    for it in range(iters):
+        if time.perf_counter() > deadline:
+            break
+        Xf = X.astype(np.float64)
+        newX = Xf.copy()
+        for i in range(len(f)):
+            brighter = np.flatnonzero(f > f[i])
+            for j in brighter:
+                r2 = np.mean((newX[i] - Xf[j]) ** 2)
+                newX[i] += beta0 * np.exp(-gamma * r2 * run.n / max(1, run.k)) * (Xf[j] - newX[i])
+        newX += alpha * (run.rng.random(X.shape) - 0.5)
+        X = _repair(run.rng.random(X.shape) < _sigmoid(10.0 * (newX - 0.5)), run.k)
+        f = run.fitness(X)
+        alpha *= 0.97
+
+def _make_wrapper_sets(
+    X: np.ndarray, y: np.ndarray, k: int, counts: Dict[str, int], cfg: PoolConfig
+) -> Tuple[Dict[str, List[np.ndarray]], Dict[Tuple[int, ...], float]]:
+    """
+    Roda PSO/GWO/FFA binários (colunas de X na ordem do ranking de MI) com o avaliador substituto
+    compartilhado; cada família recebe a fração do orçamento de tempo proporcional ao nº de sets
+    (checada entre iterações) e devolve os seus `counts[família]` melhores conjuntos distintos.
+    """
+    ev = SurrogateEvaluator(X, y, cfg.wrapper_model, cfg.seed, cfg.wrapper_n_jobs)
+    total = max(1, sum(counts.values()))
+    algos = {"PSO": (_wrapper_pso, 17), "GWO": (_wrapper_gwo, 31), "FFA": (_wrapper_ffa, 59)}
+    out: Dict[str, List[np.ndarray]] = {}
+    for fam, n_sets in counts.items():
+        algo, off = algos[fam]
+        run = _WrapperRun(
+            ev, X.shape[1], k, max(2, cfg.wrapper_population), np.random.default_rng(cfg.seed + off),
+            cfg.wrapper_size_penalty,
+        )
+        deadline = time.perf_counter() + cfg.wrapper_time_budget_s * n_sets / total
+        algo(run, cfg.wrapper_iters, deadline)
+        out[fam] = run.best_sets(n_sets)
+    return out, ev.cache
+
+# ---------- Canonicalização e diversidade do pool ----------
+def set_hash(features: List[str]) -> str:
+    """Hash canônico de um feature set (independe da ordem das features)."""
+    return hashlib.sha1("\x1f".join(sorted(features)).encode("utf-8")).hexdigest()[:16]
+
+def _rank_key(filter_key: str) -> Callable[[Dict[str, Any]], Tuple[int, float, float]]:
+    """
+    Ordem de prioridade do pool, sem misturar escalas: sets avaliados pelo surrogate (macro-F1)
+    vêm primeiro, entre si por F1; os demais por `filter_key` (mesma métrica para todo o pool).
+    """
+    def key(entry: Dict[str, Any]) -> Tuple[int, float, float]:
+        f1 = entry.get("score_surrogate_f1")
+        return (int(f1 is not None), float(f1 or 0.0), float(entry.get(filter_key, 0.0)))
+    return key
+
+class _PoolCanonicalizer:
+    """
+    Acumula entradas do pool (pack) na ordem de `rank` (ver _rank_key): duplicatas exatas (hash canônico) se fundem
+    na primeira, somando o nome em `provenance`; com `jaccard_max`, sets com similaridade de Jaccard
+    >= limite com algum já mantido são descartados (pertinência em matriz booleana, 1 matmul por set).
+    """
+
+    def __init__(self, universe: np.ndarray, jaccard_max: float | None, rank: Callable[[Dict[str, Any]], Any]):
+        self.rank = rank
+        self.pos = {f: j for j, f in enumerate(universe)}
+        self.jaccard_max = jaccard_max
+        self.kept: List[Dict[str, Any]] = []
+        self.by_hash: Dict[str, Dict[str, Any]] = {}
+        self.member = np.zeros((64, len(universe)), dtype=np.float32)
+        self.sizes = np.zeros(64, dtype=np.float32)
+        self.exact = 0
+        self.near = 0
+
+    def add(self, entries: List[Dict[str, Any]], record: bool = True) -> None:
+        # record=False (rodadas de complemento): repetições não entram na proveniência nem nas contagens
+        for e in sorted(entries, key=self.rank, reverse=True):
+            h = set_hash(e["features"])
+            if h in self.by_hash:
+                if record:
+                    self.by_hash[h]["provenance"].append(e["name"])
+                    self.exact += 1
+                continue
+            v = np.zeros(self.member.shape[1], dtype=np.float32)
+            v[[self.pos[f] for f in e["features"]]] = 1.0
+            n = len(self.kept)
+            if self.jaccard_max is not None and n:
+                inter = self.member[:n] @ v
+                jac = inter / np.maximum(self.sizes[:n] + v.sum() - inter, 1.0)
+                if float(jac.max()) >= self.jaccard_max:
+                    self.near += int(record)
+                    continue
+            if n == self.member.shape[0]:
+                self.member = np.vstack([self.member, np.zeros_like(self.member)])
+                self.sizes = np.concatenate([self.sizes, np.zeros_like(self.sizes)])
+            self.member[n], self.sizes[n] = v, v.sum()
+            e = {**e, "set_hash": h, "provenance": [e["name"]]}
+            self.by_hash[h] = e
+            self.kept.append(e)
+
 def build_feature_pool(
     df: pd.DataFrame,
-    cfg: PoolConfig
+    cfg: PoolConfig,
+    y: np.ndarray | None = None
 ) -> Dict[str, Any]:
-    random.seed(cfg.seed)
-    mi_rank = _score_features_mi(df, cfg.target_col)
+    # y dado => df já contém só features numéricas limpas (dataset colunar do make-dataset)
+    X, y = _prepare_xy(df, cfg.target_col) if y is None else (df, y)
+    mi_rank = _mi_rank(X, y, cfg)
 
     n_pso = max(1, int(round(cfg.total_sets * cfg.ratio_pso)))
     n_gwo = max(1, int(round(cfg.total_sets * cfg.ratio_gwo)))
     n_ffa = max(1, int(cfg.total_sets - n_pso - n_gwo))
 
     k = cfg.max_features_per_set
-    pso_sets = _make_pso_like(mi_rank, k, n_pso, cfg.seed)
-    gwo_sets = _make_gwo_like(mi_rank, k, n_gwo, cfg.seed)
-    ffa_sets = _make_ffa_like(mi_rank, k, n_ffa, cfg.seed)
+    universe = mi_rank.index.to_numpy()
+    n_universe = universe.size
+    R = None
+    if cfg.fitness == "mrmr":
+        R, red_info = redundancy_matrix(X[list(universe)], y, cfg)
+        fitness = _mrmr_fitness(mi_rank, R, cfg.mrmr_lambda)
+    elif cfg.fitness == "mi_sum":
+        fitness = _mi_fitness(mi_rank)
+    else:
+        raise ValueError(f"fitness inválido: {cfg.fitness!r} (use 'mi_sum' ou 'mrmr').")
+    cps = max(1, int(cfg.candidates_per_step))
+    fams = {
+        "PSO": (_make_pso_like, n_pso),
+        "GWO": (_make_gwo_like, n_gwo),
+        "FFA": (_make_ffa_like, n_ffa),
+    }
+
+    def mi_sets(seed: int) -> Dict[str, List[np.ndarray]]:
+        sets = {fam: gen(n_universe, k, n_fam, seed, fitness, cps) for fam, (gen, n_fam) in fams.items()}
+        if R is not None and cfg.mrmr_min_gain is not None:
+            w = mi_rank.to_numpy(dtype=np.float64) / max(float(mi_rank.max()), 1e-12)
+            sets = {fam: [_mrmr_prune(st, w, R, cfg.mrmr_lambda, cfg.mrmr_min_gain) for st in ss] for fam, ss in sets.items()}
+        return sets
+
+    surrogate: Dict[Tuple[int, ...], float] = {}
+    if cfg.generator == "wrapper":
+        idx = np.arange(len(y))
+        if cfg.wrapper_sample and cfg.wrapper_sample < len(y):
+            idx = stratified_subsample(y, cfg.wrapper_sample, cfg.seed)
+        Xw = X.iloc[idx][list(universe)].to_numpy(dtype=np.float32)
+        t0 = time.perf_counter()
+        idx_sets, surrogate = _make_wrapper_sets(Xw, np.asarray(y)[idx], k, {f: n for f, (_, n) in fams.items()}, cfg)
+        logger.info(f"Busca wrapper: {len(surrogate)} conjuntos avaliados em {time.perf_counter() - t0:.1f}s")
+        for fam, (gen, n_fam) in fams.items():
+            # orçamento curto: completa com o gerador guiado por MI da mesma família
+            got = idx_sets[fam]
+            if len(got) < n_fam:
+                seen = {tuple(sorted(map(int, st))) for st in got}
+                extra = [st for st in gen(n_universe, k, n_fam, cfg.seed, fitness, cps) if tuple(sorted(map(int, st))) not in seen]
+                got = got + extra[: n_fam - len(got)]
+            idx_sets[fam] = got
+    elif cfg.generator == "mi":
+        idx_sets = mi_sets(cfg.seed)
+    else:
+        raise ValueError(f"generator inválido: {cfg.generator!r} (use 'mi' ou 'wrapper').")
+    score_of = {tuple(sorted(universe[list(key)].tolist())): v for key, v in surrogate.items()}
 
     # custo estimado
     costs_map = load_feature_costs(cfg.feature_costs_path)
     def pack(name: str, feats: List[str]) -> Dict[str, Any]:
-        return {
+        rec = {
             "name": name,
             "features": feats,
             "k": len(feats),
             "score_mi_sum": float(sum(mi_rank.get(f, 0.0) for f in feats)),
             "est_cost": float(estimate_set_cost(feats, costs_map))
         }
+        if tuple(sorted(feats)) in score_of:
+            rec["score_surrogate_f1"] = score_of[tuple(sorted(feats))]
+        if R is not None:
+            pos = np.flatnonzero(np.isin(universe, feats))
+            rec["score_mrmr"] = fitness(pos)
+            sub = R[np.ix_(pos, pos)]
+            rec["redundancy_mean"] = float((sub.sum() - np.trace(sub)) / max(1, pos.size * (pos.size - 1)))
+        return rec
+
+    def packed(sets: Dict[str, List[np.ndarray]], tag: str = "") -> List[Dict[str, Any]]:
+        return [pack(f"{fam}{tag}_{i+1}", universe[st].tolist()) for fam in fams for i, st in enumerate(sets[fam])]
 
-    pool = []
-    for i, s in enumerate(pso_sets):
-        pool.append(pack(f"PSO_{i+1}", s))
-    for i, s in enumerate(gwo_sets):
-        pool.append(pack(f"GWO_{i+1}", s))
-    for i, s in enumerate(ffa_sets):
-        pool.append(pack(f"FFA_{i+1}", s))
+    # uma única métrica de filtro por pool: a fitness configurada (mRMR ou soma de MI)
+    rank = _rank_key("score_mrmr" if R is not None else "score_mi_sum")
+    canon = _PoolCanonicalizer(universe, cfg.jaccard_max, rank)
+    canon.add(packed(idx_sets))
+    generated = sum(len(v) for v in idx_sets.values())
+    # duplicatas/quase-duplicatas removidas => novas rodadas (outra seed) até completar total_sets
+    rounds = 0
+    while len(canon.kept) < cfg.total_sets and rounds < cfg.topup_rounds:
+        rounds += 1
+        before = len(canon.kept)
+        extra = mi_sets(cfg.seed + 1000 * rounds)
+        generated += sum(len(v) for v in extra.values())
+        canon.add(packed(extra, f"r{rounds}"), record=False)
+        if len(canon.kept) > cfg.total_sets and before < cfg.total_sets:
+            # a rodada de complemento só preenche o que falta (as originais ficam todas)
+            canon.kept = canon.kept[:before] + sorted(canon.kept[before:], key=rank, reverse=True)[:cfg.total_sets - before]
+    if len(canon.kept) < cfg.total_sets:
+        logger.warning(f"Pool com {len(canon.kept)} sets distintos (< total_sets={cfg.total_sets}); universo pequeno ou jaccard_max restritivo.")
+    logger.info(
+        f"Pool: {generated} sets gerados -> {len(canon.kept)} mantidos "
+        f"({canon.exact} duplicatas exatas, {canon.near} quase-duplicatas, {rounds} rodada(s) de complemento)"
+    )
+    pool = canon.kept
 
     # ordena por score_mi_sum decrescente (só para inspeção; manteremos todos)
     pool = sorted(pool, key=lambda d: d["score_mi_sum"], reverse=True)
 
-    return {
+    out = {
         "target_col": cfg.target_col,
         "max_features_per_set": cfg.max_features_per_set,
         "total_sets": cfg.total_sets,
         "seed": cfg.seed,
+        "fitness": cfg.fitness,
+        "dedup": {
+            "generated": generated,
+            "kept": len(pool),
+            "exact_duplicates": canon.exact,
+            "near_duplicates": canon.near,
+            "jaccard_max": cfg.jaccard_max,
+            "topup_rounds": rounds,
+        },
         "pool": pool,
         "mi_top10": mi_rank.head(10).to_dict(),
         "n_features_universe": int(mi_rank.shape[0]),
     }
+    if R is not None:
+        out["redundancy"] = {**red_info, "mrmr_lambda": cfg.mrmr_lambda, "mrmr_min_gain": cfg.mrmr_min_gain}
+    return out
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import time
 import numpy as np
 import pandas as pd
@@ -24,6 +24,7 @@ class GatekeeperModel:
         )
         self.feature_names_: Optional[List[str]] = None
         self.classes_: Optional[np.ndarray] = None
+        self.compiled_: Optional[Dict[str, Any]] = None
 
     def fit(self, X: pd.DataFrame, y: pd.Series) -> dict:
         self.feature_names_ = list(X.columns)
@@ -34,18 +35,87 @@ class GatekeeperModel:
         y_pred = self.model.predict(X_val)
         f1 = f1_score(y_val, y_pred, average="macro")
         self.classes_ = self.model.classes_
+        self.compile()
         return {
             "f1_macro": float(f1),
             "report": classification_report(y_val, y_pred, zero_division=0)
         }
 
+    def compile(self) -> "GatekeeperModel":
+        """
+        Achata a árvore ajustada em arrays (feature, threshold, filhos, classe da folha)
+        para avaliação vetorizada em NumPy, sem a validação de entrada do sklearn.
+        Folhas apontam para si mesmas, então o percurso é branch-free por `max_depth` passos.
+        """
+        t = self.model.tree_
+        is_leaf = t.children_left == -1
+        node_ids = np.arange(t.node_count, dtype=np.intp)
+        left = np.where(is_leaf, node_ids, t.children_left)
+        right = np.where(is_leaf, node_ids, t.children_right)
+        missing_left = getattr(t, "missing_go_to_left", None)
+        has_missing = missing_left is not None and bool(np.any(np.asarray(missing_left, dtype=bool) & ~is_leaf))
+        self.compiled_ = {
+            "feature": np.where(is_leaf, 0, t.feature).astype(np.intp),
+            "threshold": np.where(is_leaf, np.inf, t.threshold).astype(np.float64),
+            # filhos intercalados: children[2*no + 0] = esquerda, children[2*no + 1] = direita
+            "children": np.stack([left, right], axis=1).ravel().astype(np.intp),
+            "missing_left": (np.asarray(missing_left, dtype=bool) & ~is_leaf) if has_missing else None,
+            # mesma regra do sklearn: classes_.take(argmax(value[folha]))
+            "leaf_class": np.argmax(t.value[:, 0, :], axis=1).astype(np.intp),
+            "depth": int(t.max_depth),
+        }
+        return self
+
+    def predict_array(self, X: np.ndarray, feature_index: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Predição direta sobre array numérico (n, n_features) na ordem de `feature_names_`.
+        Com `feature_index`, X pode ser uma matriz mais larga (ex.: união de features da
+        inferência): feature_index[j] = coluna de X que contém feature_names_[j] (sem cópia).
+        Bit-idêntica ao sklearn: X em float32 comparado ao threshold em float64.
+        """
+        c = getattr(self, "compiled_", None)
+        if c is None:
+            c = self.compile().compiled_
+        if feature_index is not None:
+            c = dict(c, feature=np.asarray(feature_index, dtype=np.intp).take(c["feature"]))
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n, n_feat = X.shape
+        if n <= 4:
+            return self.classes_.take([self._walk_row(c, X[i]) for i in range(n)], axis=0)
+
+        Xf = X.ravel()
+        base = np.arange(n, dtype=np.intp) * n_feat
+        feature, threshold, children, missing_left = c["feature"], c["threshold"], c["children"], c["missing_left"]
+        node = np.zeros(n, dtype=np.intp)
+        for _ in range(c["depth"]):
+            x = Xf.take(base + feature.take(node))
+            go_right = ~(x <= threshold.take(node))
+            if missing_left is not None:
+                nan = np.isnan(x)
+                go_right[nan] = ~missing_left.take(node[nan])
+            node = children.take(2 * node + go_right)
+        return self.classes_.take(c["leaf_class"].take(node), axis=0)
+
+    @staticmethod
+    def _walk_row(c: Dict[str, Any], x: np.ndarray) -> int:
+        # percurso escalar (1 fluxo): evita o overhead de alocação do caminho vetorizado
+        node = 0
+        children = c["children"]
+        for _ in range(c["depth"]):
+            v = x[c["feature"][node]]
+            if v != v and c["missing_left"] is not None:  # NaN
+                node = children[2 * node + (0 if c["missing_left"][node] else 1)]
+            else:
+                node = children[2 * node + (0 if v <= c["threshold"][node] else 1)]
+        return c["leaf_class"][node]
+
     def predict(self, X: pd.DataFrame) -> Tuple[np.ndarray, float]:
         # Retorna (predicoes, latencia_ms_por_amostra)
         if self.feature_names_ is None:
             self.feature_names_ = list(X.columns)
-        X = X[self.feature_names_]
+        Xa = X[self.feature_names_].to_numpy(dtype=np.float32)
         t0 = time.perf_counter()
-        y_pred = self.model.predict(X)
+        y_pred = self.predict_array(Xa)
         lat_ms_total = (time.perf_counter() - t0) * 1000.0
         return y_pred, lat_ms_total / max(len(X), 1)
 
@@ -0,0 +1,126 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Type
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+
+class SpecialistAdapter:
+    """
+    Adaptador genérico: recebe um array float32 (n, k) já na ordem de `features`
+    e devolve as predições do especialista. Subclasses chamam o booster nativo
+    direto, evitando a revalidação de nomes/dtypes do `predict(DataFrame)` sklearn.
+    """
+
+    def __init__(self, model: Any, features: List[str]):
+        self.model = model
+        self.features = list(features)
+        self.n_threads: Optional[int] = None  # None => padrão do modelo
+
+    def set_threads(self, n: int) -> None:
+        """Orçamento de threads do booster por chamada (coordenado pelo n_workers da inferência)."""
+        self.n_threads = int(n)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        # fallback: caminho sklearn-style (DataFrame com nomes de coluna)
+        return np.asarray(self.model.predict(pd.DataFrame(X, columns=self.features, copy=False))).ravel()
+
+
+class SklearnAdapter(SpecialistAdapter):
+    """
+    Estimadores sklearn (HGB/RF): predict direto em array, sem checagem de nomes.
+    Usa uma cópia rasa privada do estimador (sem `feature_names_in_`, com o n_jobs do
+    adaptador); o modelo recebido não é alterado.
+    """
+
+    def __init__(self, model: Any, features: List[str]):
+        super().__init__(model, features)
+        names = getattr(model, "feature_names_in_", None)
+        # a ordem das colunas é garantida pelo chamador; sem nomes o sklearn só confere n_features
+        self._strip_names = names is not None and list(names) == self.features
+        self._est = copy.copy(model)  # rasa: compartilha as árvores/arrays ajustados
+        if self._strip_names:
+            del self._est.feature_names_in_
+
+    def set_threads(self, n: int) -> None:
+        super().set_threads(n)
+        # RF paraleliza via joblib (n_jobs); HGB usa OpenMP global e não é limitado aqui
+        if hasattr(self._est, "n_jobs"):
+            self._est.n_jobs = self.n_threads
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if not self._strip_names:
+            return np.asarray(self._est.predict(pd.DataFrame(X, columns=self.features, copy=False))).ravel()
+        return np.asarray(self._est.predict(X)).ravel()
+
+
+class LGBMAdapter(SpecialistAdapter):
+    """LightGBM: Booster.predict em float32 contíguo + argmax (mesma regra do LGBMClassifier)."""
+
+    def __init__(self, model: Any, features: List[str]):
+        super().__init__(model, features)
+        self.booster = model.booster_
+        self.classes = np.asarray(model.classes_)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        kw: Dict[str, Any] = {"num_threads": self.n_threads} if self.n_threads else {}
+        proba = self.booster.predict(X, **kw)
+        if proba.ndim == 1:
+            # binário: predict_proba = [1-p, p]; argmax empata para a classe 0
+            idx = (proba > 1.0 - proba).astype(np.intp)
+        else:
+            idx = np.argmax(proba, axis=1)
+        return self.classes.take(idx)
+
+
+class XGBAdapter(SpecialistAdapter):
+    """XGBoost: Booster.inplace_predict (sem DMatrix) + regra de classe do XGBClassifier."""
+
+    def __init__(self, model: Any, features: List[str]):
+        super().__init__(model, features)
+        self.booster = model.get_booster()
+        best = getattr(model, "best_iteration", None)
+        self.iteration_range = (0, int(best) + 1) if best is not None else (0, 0)
+        self.softmax = getattr(model, "objective", None) == "multi:softmax"
+
+    def set_threads(self, n: int) -> None:
+        super().set_threads(n)
+        self.booster.set_param({"nthread": self.n_threads})
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        out = self.booster.inplace_predict(X, iteration_range=self.iteration_range, validate_features=False)
+        if self.softmax:
+            return np.asarray(out).astype(np.int32).ravel()
+        if out.ndim > 1 and out.shape[1] > 1:
+            return np.argmax(out, axis=1)
+        return (out.ravel() > 0.5).astype(np.intp)
+
+
+class CatBoostAdapter(SpecialistAdapter):
+    """CatBoost: predict direto em array numérico (saída (n, 1) achatada)."""
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        kw: Dict[str, Any] = {"thread_count": self.n_threads} if self.n_threads else {}
+        return np.asarray(self.model.predict(X, **kw)).ravel()
+
+
+# model_key (specialist_map.json) -> adaptador
+ADAPTERS: Dict[str, Type[SpecialistAdapter]] = {
+    "lgbm": LGBMAdapter,
+    "xgb": XGBAdapter,
+    "cat": CatBoostAdapter,
+    "sk_hgb": SklearnAdapter,
+    "sk_rf": SklearnAdapter,
+}
+
+
+def make_adapter(model_key: str, model: Any, features: List[str]) -> SpecialistAdapter:
+    """Seleciona o adaptador pelo `model_key`; cai no caminho genérico se o modelo não casar."""
+    cls = ADAPTERS.get(model_key, SpecialistAdapter)
+    try:
+        return cls(model, features)
+    except AttributeError:
+        # ex.: modelo não ajustado ou tipo diferente do esperado para a chave
+        return SpecialistAdapter(model, features)
@@ -1,18 +1,23 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
 from typing import Dict, Any, List, Tuple, Optional
 
 import json
+import os
 import time
 import joblib
 import numpy as np
 import pandas as pd
 from loguru import logger
 
-# Repetições para cronometria robusta (min de várias execuções)
+from twodaef.infer.adapters import make_adapter
+
+# Repetições para cronometria robusta (min de várias execuções) — só no modo "benchmark"
 GK_BENCH_REPEATS = 7     # gatekeeper (batch)
-S2_BENCH_REPEATS = 3     # especialista (por linha)
+S2_BENCH_REPEATS = 3     # especialista (por lote/linha)
 
 
 @dataclass
@@ -20,10 +25,30 @@ class TwoStageConfig:
     gatekeeper_model: str
     gatekeeper_features_file: str  # arquivo texto com uma feature por linha
     specialist_map_json: str       # artifacts/specialist_map.json
-    input_csv: str                 # dados para inferência
-    output_csv: str                # onde salvar as predições
+    input_csv: Optional[str] = None   # dados para inferência (não usado no modo servidor)
+    output_csv: Optional[str] = None  # onde salvar as predições (não usado no modo servidor)
     fill_missing: float = 0.0      # valor para preencher colunas ausentes
     gatekeeper_labelmap_json: Optional[str] = None  # mapeia saída do GK -> chave do especialista
+    stage2_mode: str = "batch"     # "batch" (1 predict por especialista) | "row" (linha a linha, p/ estudos de latência)
+    mode: str = "predict"          # "predict" (produção: 1 chamada por estágio) | "benchmark" (warm-up + repetições)
+    benchmark_json: Optional[str] = None  # relatório de latência do modo benchmark (padrão: <output_csv>.latency.json)
+    chunk_size: Optional[int] = None      # streaming: nº de linhas por bloco (None => carrega o CSV inteiro)
+    passthrough_cols: Optional[List[str]] = None  # colunas extras copiadas p/ a saída (ex.: ["label"])
+    keep_all_columns: bool = False        # True => lê e devolve todas as colunas do input (sem projeção)
+    n_workers: int = 1                    # >1 => lotes de especialistas (por classe) em paralelo numa thread pool
+
+
+# colunas produzidas pela inferência
+PRED_COLS = [
+    "pred_gatekeeper",
+    "pred_gatekeeper_mapped",
+    "pred_final",
+    "specialist_model",
+    "specialist_featureset",
+    "latency_ms_stage1",
+    "latency_ms_stage2",
+    "latency_ms_total_est",
+]
 
 
 class TwoStageInferencer:
@@ -33,6 +58,33 @@ class TwoStageInferencer:
         self.gk_features = self._load_feature_list(cfg.gatekeeper_features_file)
         self.spec_map = self._load_specialists(cfg.specialist_map_json)  # {class_name: {...}}
 
+        # GatekeeperModel com árvore compilada: predição direta em array (ordem = feature_names_)
+        self.gk_fast_features: List[str] = list(getattr(self.gatekeeper, "feature_names_", None) or [])
+        self._gk_fast = callable(getattr(self.gatekeeper, "predict_array", None)) and bool(self.gk_fast_features)
+
+        # União das features (GK + todos os especialistas), calculada 1x: projeção na leitura do CSV
+        # e esquema da matriz float32 compartilhada por lote (ver _build_matrix)
+        self.feature_union: List[str] = list(dict.fromkeys(
+            self.gk_features + self.gk_fast_features + [f for sp in self.spec_map.values() for f in sp["features"]]
+        ))
+        self.union_index: Dict[str, int] = {c: j for j, c in enumerate(self.feature_union)}
+        self.gk_cols = self._column_selector(self.gk_features)
+        self.gk_fast_index = np.asarray([self.union_index[c] for c in self.gk_fast_features], dtype=np.intp)
+        for sp in self.spec_map.values():
+            sp["cols"] = self._column_selector(sp["features"])
+        # passthrough vai inteiro para a saída (inclusive features); a união só define o que é lido em float32
+        self.passthrough: List[str] = list(dict.fromkeys(cfg.passthrough_cols or []))
+
+        # Paralelismo da etapa 2: n_workers threads x (núcleos / n_workers) threads por booster,
+        # para não sobrecarregar os núcleos quando vários especialistas rodam ao mesmo tempo
+        self._pool: Optional[ThreadPoolExecutor] = None
+        if cfg.n_workers > 1:
+            self._pool = ThreadPoolExecutor(max_workers=cfg.n_workers, thread_name_prefix="twodaef-s2")
+            budget = max(1, (os.cpu_count() or 1) // cfg.n_workers)
+            for sp in self.spec_map.values():
+                sp["adapter"].set_threads(budget)
+            logger.info(f"Etapa 2 paralela: {cfg.n_workers} workers x {budget} threads por especialista")
+
         # Auto-descoberta de labelmap se não for fornecido
         lm_path: Optional[str] = cfg.gatekeeper_labelmap_json
         if not lm_path:
@@ -48,6 +100,26 @@ class TwoStageInferencer:
                     break
         self.labelmap = self._load_labelmap(lm_path)  # pode ser {}
 
+        # Tabela de roteamento pré-computada: saída do GK (str) -> (chave do especialista, fallback int).
+        # O GK emite poucas classes distintas; o custo de labelmap/heurística é pago 1x por classe.
+        self.route_table: Dict[str, Tuple[str, int]] = {}
+        gk_classes = getattr(self.gatekeeper, "classes_", None)
+        if gk_classes is not None:
+            for gk_cls in np.asarray(gk_classes).ravel():
+                self._route_entry(gk_cls)
+
+    def close(self) -> None:
+        """Encerra o thread pool da etapa 2 (n_workers > 1); idempotente."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self) -> "TwoStageInferencer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
     @staticmethod
     def _load_gatekeeper(path: str):
         p = Path(path)
@@ -72,21 +144,32 @@ class TwoStageInferencer:
     def _load_specialists(path: str) -> Dict[str, Any]:
         d = json.loads(Path(path).read_text(encoding="utf-8"))
         specs: Dict[str, Any] = {}
+        # classes que apontam para o mesmo artefato compartilham modelo e adaptador (carregados 1x)
+        loaded: Dict[Tuple[str, Tuple[str, ...]], Tuple[Any, Any]] = {}
         for cls_name, payload in d.get("specialists", {}).items():
             mpath = Path(payload["model_path"])
             if not mpath.exists():
                 logger.warning(f"Modelo do especialista ausente para classe {cls_name}: {mpath}")
                 continue
-            model = joblib.load(mpath)
             feats = list(payload["features"])
+            model_key = payload.get("model_key", "")
+            key = (str(mpath.resolve()), tuple(feats))
+            if key not in loaded:
+                model = joblib.load(mpath)
+                # caminho rápido: booster nativo sobre array float32 (selecionado por model_key)
+                loaded[key] = (model, make_adapter(model_key, model, feats))
+            model, adapter = loaded[key]
             specs[str(cls_name)] = {
                 "model": model,
+                "adapter": adapter,
                 "features": feats,
-                "model_key": payload.get("model_key", ""),
+                "model_key": model_key,
                 "feature_set_name": payload.get("feature_set_name", "")
             }
         if not specs:
             raise RuntimeError("Nenhum especialista carregado a partir do mapa.")
+        if len(loaded) < len(specs):
+            logger.info(f"Especialistas: {len(specs)} classes, {len(loaded)} modelo(s) únicos carregados")
         return specs
 
     @staticmethod
@@ -125,136 +208,395 @@ class TwoStageInferencer:
         except Exception:
             return None
 
-    def _ensure_columns(self, df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
-        df = df.copy()
-        for c in cols:
-            if c not in df.columns:
-                df[c] = self.cfg.fill_missing
-        # manter ordem
-        return df[cols]
-
-    def predict_csv(self) -> Tuple[float, float, float]:
-        # 1) carregar dados
-        df = pd.read_csv(self.cfg.input_csv)
-        n = df.shape[0]
-        if n == 0:
-            raise ValueError("input_csv não possui linhas.")
-
-        # 2) etapa 1 — gatekeeper
-        Xgk = self._ensure_columns(df, self.gk_features)
+    def _column_selector(self, cols: List[str]) -> Any:
+        """
+        Índices de `cols` na matriz da união. Blocos contíguos viram `slice` (view sem cópia);
+        caso contrário, um array de índices inteiros.
+        """
+        idx = np.asarray([self.union_index[c] for c in cols], dtype=np.intp)
+        if idx.size and np.array_equal(idx, np.arange(idx[0], idx[0] + idx.size)):
+            return slice(int(idx[0]), int(idx[0]) + idx.size)
+        return idx
 
-        # Alguns modelos salvos do gatekeeper retornam (y_pred, lat_ms) ou (y_pred, meta)
-        _res = self.gatekeeper.predict(Xgk)
-        if isinstance(_res, tuple):
-            gk_pred = _res[0]
-        else:
-            gk_pred = _res
+    def _build_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Uma única matriz float32 contígua (n, |união|) por lote; colunas ausentes em `df`
+        recebem fill_missing. GK e especialistas leem fatias dela (sem cópias de DataFrame).
+        """
+        M = np.empty((df.shape[0], len(self.feature_union)), dtype=np.float32)
+        for j, c in enumerate(self.feature_union):
+            if c in df.columns:
+                M[:, j] = df[c].to_numpy(dtype=np.float32)
+            else:
+                M[:, j] = self.cfg.fill_missing
+        return M
 
-        # garantir shape 1-D
-        gk_pred = np.asarray(gk_pred).ravel()
+    @staticmethod
+    def _take(M: np.ndarray, rows: Any, cols: Any) -> np.ndarray:
+        # fatia (linhas, colunas) da matriz compartilhada: 1 cópia no máximo
+        if isinstance(cols, slice):
+            return M[rows, cols]
+        return M[np.ix_(rows, cols)] if isinstance(rows, np.ndarray) else M[rows][:, cols]
+
+    def _route_label(self, gp: Any) -> str:
+        """Converte a saída do gatekeeper na chave de especialista (labelmap -> heurística -> str)."""
+        # 1) aplica labelmap (se houver)
+        if self.labelmap:
+            mapped = self.labelmap.get(str(gp))
+            if mapped is not None:
+                return str(mapped)
+        # 2) se não mapeou, tenta heurística (binário)
+        cls = self._heuristic_bin_map(gp)
+        # 3) se ainda None, usa str direto (último recurso)
+        return cls if cls is not None else str(gp)
+
+    def _route_entry(self, gp: Any) -> Tuple[str, int]:
+        """Entrada (chave, fallback) da tabela de roteamento; calcula e memoriza se ausente."""
+        key = str(gp)
+        entry = self.route_table.get(key)
+        if entry is None:
+            cls = self._route_label(gp)
+            entry = (cls, self._fallback_int(cls))
+            self.route_table[key] = entry
+        return entry
+
+    def _route(self, gk_pred: np.ndarray) -> np.ndarray:
+        """Roteamento vetorizado: np.unique sobre as predições do GK + take na tabela."""
+        uniq, inv = np.unique(gk_pred, return_inverse=True)
+        keys = np.asarray([self._route_entry(u)[0] for u in uniq], dtype=object)
+        return keys.take(inv.ravel())
+
+    def _fallback_int(self, cls: str) -> int:
+        # fallback: coerção segura para 0/1
+        try:
+            return int(cls)
+        except Exception:
+            h = self._heuristic_bin_map(cls)
+            return int(h) if h is not None else 0
 
-        # warm-up para estabilizar caches/JIT
-        _ = self.gatekeeper.predict(Xgk.iloc[: min(512, len(Xgk))])
+    def _coerce_preds(self, yhat: Any) -> np.ndarray:
+        """Garante inteiros (0/1, índices de classe) para avaliação numérica."""
+        yhat = np.asarray(yhat).ravel()
+        try:
+            return yhat.astype(np.int64)
+        except (TypeError, ValueError):
+            # se por algum motivo veio string, aplica heurística
+            return np.asarray([self._fallback_int(str(v)) for v in yhat], dtype=np.int64)
 
-        # bench robusto do gatekeeper (batch): melhor tempo / n
-        gk_best_ns = None
-        for _rep in range(GK_BENCH_REPEATS):
+    @staticmethod
+    def _timed_predict(predict_fn: Any, X: Any, repeats: int = 1) -> Tuple[Any, int]:
+        """
+        Executa `predict_fn(X)` `repeats` vezes e retorna (saída, melhor tempo em ns).
+        Com repeats=1 (modo predict) o custo extra é apenas o par de perf_counter_ns.
+        """
+        best_ns = None
+        out = None
+        for _rep in range(max(1, repeats)):
             ns0 = time.perf_counter_ns()
-            _ = self.gatekeeper.predict(Xgk)
-            ns1 = time.perf_counter_ns()
-            dt = ns1 - ns0
-            gk_best_ns = dt if (gk_best_ns is None or dt < gk_best_ns) else gk_best_ns
-        gk_ms = (gk_best_ns / 1e6) / max(1, n)
-
-        # 3) etapa 2 — especialista por linha
-        final_pred: List[int] = []
+            out = predict_fn(X)
+            dt = time.perf_counter_ns() - ns0
+            best_ns = dt if (best_ns is None or dt < best_ns) else best_ns
+        return out, best_ns
+
+    def _stage2_row(
+        self, M: np.ndarray, gk_mapped: np.ndarray, repeats: int = 1
+    ) -> Tuple[np.ndarray, List[str], List[str], np.ndarray]:
+        """Etapa 2 linha a linha (1 predict por fluxo) — mantido para estudos de latência."""
+        n = len(gk_mapped)
+        final_pred = np.zeros(n, dtype=np.int64)
         spec_used: List[str] = []
         spec_set: List[str] = []
-        stage2_times: List[float] = []
-        gk_mapped: List[str] = []  # novo: mapa aplicado na saída do GK
-
-        for i, gp in enumerate(gk_pred):
-            # 3.1) aplica labelmap (se houver)
-            cls: Optional[str] = None
-            if self.labelmap:
-                key = str(gp)
-                mapped = self.labelmap.get(key)
-                if mapped is not None:
-                    cls = str(mapped)
-
-            # 3.2) se não mapeou, tenta heurística (binário)
-            if cls is None:
-                cls = self._heuristic_bin_map(gp)
-
-            # 3.3) se ainda None, usa str direto (último recurso)
-            if cls is None:
-                cls = str(gp)
-
-            gk_mapped.append(cls)  # guarda o mapeado (string '0'/'1' na prática do UNSW)
+        stage2_times = np.zeros(n, dtype=np.float64)
 
+        fallback: Dict[str, int] = {k: fb for k, fb in self.route_table.values()}
+        for i, cls in enumerate(gk_mapped):
             spec = self.spec_map.get(cls)
             if spec is None:
-                # fallback: coerção segura para 0/1
-                try:
-                    yhat_int = int(cls)
-                except Exception:
-                    h = self._heuristic_bin_map(cls)
-                    yhat_int = int(h) if h is not None else 0
-
-                final_pred.append(yhat_int)
+                final_pred[i] = fallback[cls]
                 spec_used.append("fallback_gk")
                 spec_set.append("NA")
-                stage2_times.append(0.0)
                 continue
 
-            feats = spec["features"]
-            model = spec["model"]
-            row_df = df.iloc[[i]]  # manter DataFrame
-            Xsp = self._ensure_columns(row_df, feats)
-
-            # bench robusto por linha (pega o mínimo de S2_BENCH_REPEATS)
-            best_ns = None
-            yhat = None
-            for _rep in range(S2_BENCH_REPEATS):
-                ns2 = time.perf_counter_ns()
-                yhat = model.predict(Xsp)[0]
-                ns3 = time.perf_counter_ns()
-                dt = ns3 - ns2
-                best_ns = dt if (best_ns is None or dt < best_ns) else best_ns
-
-            # garante inteiro 0/1 para avaliação numérica
-            try:
-                yhat_int = int(yhat)
-            except Exception:
-                # se por algum motivo veio string, aplica heurística
-                h = self._heuristic_bin_map(yhat)
-                yhat_int = int(h) if h is not None else 0
-
-            final_pred.append(yhat_int)
+            adapter = spec["adapter"]
+            Xsp = self._take(M, slice(i, i + 1), spec["cols"])  # 1 linha (view se colunas contíguas)
+
+            # no modo benchmark pega o mínimo de `repeats` execuções
+            yhat, best_ns = self._timed_predict(adapter.predict, Xsp, repeats)
+
+            final_pred[i] = self._coerce_preds(yhat)[0]
             spec_used.append(spec.get("model_key", ""))
             spec_set.append(spec.get("feature_set_name", ""))
-            stage2_times.append(best_ns / 1e6)  # ms
+            stage2_times[i] = best_ns / 1e6  # ms
+
+        return final_pred, spec_used, spec_set, stage2_times
 
-        # 4) métricas de latência
-        stage2_ms = float(np.mean(stage2_times)) if stage2_times else 0.0
+    @staticmethod
+    def _group_rows(gk_mapped: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+        """Particiona os índices de linha por classe roteada (1 argsort, sem varreduras por classe)."""
+        keys, inv = np.unique(np.asarray(gk_mapped, dtype=object), return_inverse=True)
+        inv = inv.ravel()
+        order = np.argsort(inv, kind="stable")
+        bounds = np.cumsum(np.bincount(inv, minlength=len(keys)))[:-1]
+        return [(str(k), rows) for k, rows in zip(keys, np.split(order, bounds))]
+
+    def _stage2_batch(
+        self, M: np.ndarray, gk_mapped: np.ndarray, repeats: int = 1
+    ) -> Tuple[np.ndarray, List[str], List[str], np.ndarray]:
+        """
+        Etapa 2 em lote: particiona as linhas pela classe mapeada do gatekeeper e faz
+        um único predict por modelo de especialista (classes que compartilham o modelo
+        são pontuadas juntas). Resultados voltam à ordem original da entrada;
+        a latência de cada linha é o tempo do lote dividido pelo nº de linhas do lote.
+        """
+        n = len(gk_mapped)
+        final_pred = np.zeros(n, dtype=np.int64)
+        spec_used = np.full(n, "fallback_gk", dtype=object)
+        spec_set = np.full(n, "NA", dtype=object)
+        stage2_times = np.zeros(n, dtype=np.float64)
+
+        fallback: Dict[str, int] = {k: fb for k, fb in self.route_table.values()}
+        # classes que compartilham o mesmo modelo viram um único lote (um predict por modelo)
+        by_model: Dict[int, Tuple[List[np.ndarray], Dict[str, Any]]] = {}
+        for cls, rows in self._group_rows(gk_mapped):
+            spec = self.spec_map.get(cls)
+            if spec is None:
+                final_pred[rows] = fallback[cls]
+                continue
+            by_model.setdefault(id(spec["adapter"]), ([], spec))[0].append(rows)
+        tasks: List[Tuple[np.ndarray, Dict[str, Any]]] = [
+            (parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts)), spec)
+            for parts, spec in by_model.values()
+        ]
+
+        def run(task: Tuple[np.ndarray, Dict[str, Any]]) -> Tuple[Any, int]:
+            rows, spec = task
+            Xsp = self._take(M, rows, spec["cols"])
+            return self._timed_predict(spec["adapter"].predict, Xsp, repeats)
+
+        # especialistas de classes distintas são independentes (boosters liberam o GIL)
+        if self._pool is not None and len(tasks) > 1:
+            results = list(self._pool.map(run, tasks))
+        else:
+            results = [run(t) for t in tasks]
+
+        for (rows, spec), (yhat, best_ns) in zip(tasks, results):
+            final_pred[rows] = self._coerce_preds(yhat)
+            spec_used[rows] = spec.get("model_key", "")
+            spec_set[rows] = spec.get("feature_set_name", "")
+            stage2_times[rows] = (best_ns / 1e6) / len(rows)  # ms/linha (amortizado)
+
+        return final_pred, spec_used.tolist(), spec_set.tolist(), stage2_times
+
+    def _predict_frame(self, df: pd.DataFrame, bench: bool) -> Dict[str, Any]:
+        """
+        Executa as duas etapas sobre um DataFrame (arquivo inteiro ou um bloco do streaming),
+        anexando as colunas de saída *no próprio* `df` (sem cópia) e devolvendo as
+        estatísticas de latência do bloco.
+        """
+        n = df.shape[0]
+
+        # 0) matriz float32 compartilhada (união de features), montada 1x por lote
+        M = self._build_matrix(df)
+
+        # 1) etapa 1 — gatekeeper (uma única chamada no modo predict)
+        if self._gk_fast:
+            # árvore compilada: percorre a própria matriz M via índices de coluna (zero-copy)
+            Xgk = M
+            gk_fn = partial(self.gatekeeper.predict_array, feature_index=self.gk_fast_index)
+        else:
+            Xgk = pd.DataFrame(self._take(M, slice(None), self.gk_cols), columns=self.gk_features, copy=False)
+            gk_fn = self.gatekeeper.predict
+
+        # Alguns modelos salvos do gatekeeper retornam (y_pred, lat_ms) ou (y_pred, meta)
+        _res, gk_ns = self._timed_predict(gk_fn, Xgk)
+        if isinstance(_res, tuple):
+            gk_pred = _res[0]
+        else:
+            gk_pred = _res
+
+        # garantir shape 1-D
+        gk_pred = np.asarray(gk_pred).ravel()
+
+        gk_samples_ns: List[int] = [gk_ns]
+        if bench:
+            # warm-up para estabilizar caches/JIT
+            _ = gk_fn(Xgk[: min(512, len(Xgk))])
+            # bench robusto do gatekeeper (batch): melhor tempo / n
+            gk_samples_ns = []
+            for _rep in range(GK_BENCH_REPEATS):
+                _, dt = self._timed_predict(gk_fn, Xgk)
+                gk_samples_ns.append(dt)
+            gk_ns = min(gk_samples_ns)
+        gk_ms = (gk_ns / 1e6) / max(1, n)
+
+        # 2) etapa 2 — especialista (em lote por classe ou por linha)
+        s2_repeats = S2_BENCH_REPEATS if bench else 1
+        gk_mapped = self._route(gk_pred)  # mapa aplicado na saída do GK (vetorizado)
+        if self.cfg.stage2_mode == "row":
+            final_pred, spec_used, spec_set, stage2_times = self._stage2_row(M, gk_mapped, s2_repeats)
+        elif self.cfg.stage2_mode == "batch":
+            final_pred, spec_used, spec_set, stage2_times = self._stage2_batch(M, gk_mapped, s2_repeats)
+        else:
+            raise ValueError(f"stage2_mode inválido: {self.cfg.stage2_mode!r} (use 'batch' ou 'row').")
+
+        stage2_ms = float(np.mean(stage2_times)) if stage2_times.size else 0.0
+
+        # 3) colunas de saída (latências do bloco)
+        df["pred_gatekeeper"] = gk_pred
+        df["pred_gatekeeper_mapped"] = gk_mapped  # útil p/ depuração e avaliação
+        df["pred_final"] = final_pred
+        df["specialist_model"] = spec_used
+        df["specialist_featureset"] = spec_set
+        df["latency_ms_stage1"] = round(gk_ms, 6)
+        df["latency_ms_stage2"] = np.round(stage2_times, 6)
+        df["latency_ms_total_est"] = round(gk_ms + stage2_ms, 6)
+
+        return {
+            "n": n,
+            "gk_ns": gk_ns,
+            "gk_samples_ns": gk_samples_ns,
+            "gk_mapped": gk_mapped,
+            "spec_used": spec_used,
+            "stage2_times": stage2_times,
+        }
+
+    def predict_frame(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Caminho de produção em memória (ex.: servidor HTTP): anexa as colunas de predição
+        a `df` e devolve as estatísticas de latência do lote.
+        """
+        if df.shape[0] == 0:
+            raise ValueError("DataFrame de entrada não possui linhas.")
+        return self._predict_frame(df, bench=False)
+
+    def _read_kwargs(self) -> Dict[str, Any]:
+        """
+        Projeção de colunas na leitura: só a união de features (float32) + passthrough,
+        a menos que keep_all_columns. Colunas ausentes no arquivo são preenchidas depois
+        com fill_missing.
+        """
+        kw: Dict[str, Any] = {"dtype": {c: np.float32 for c in self.feature_union}}
+        if not self.cfg.keep_all_columns:
+            wanted = set(self.feature_union) | set(self.passthrough)
+            kw["usecols"] = lambda c: c in wanted
+        return kw
+
+    def _iter_input(self):
+        """Itera o input_csv inteiro (1 bloco) ou em blocos de `chunk_size` linhas."""
+        kw = self._read_kwargs()
+        if self.cfg.chunk_size:
+            if self.cfg.chunk_size <= 0:
+                raise ValueError("chunk_size deve ser positivo.")
+            yield from pd.read_csv(self.cfg.input_csv, chunksize=self.cfg.chunk_size, **kw)
+        else:
+            yield pd.read_csv(self.cfg.input_csv, **kw)
+
+    def _output_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Colunas gravadas: passthrough + predições (ou tudo, com keep_all_columns)."""
+        if self.cfg.keep_all_columns:
+            return df
+        missing = [c for c in self.passthrough if c not in df.columns]
+        if missing:
+            logger.warning(f"Colunas de passthrough ausentes no input_csv: {missing}")
+            self.passthrough = [c for c in self.passthrough if c in df.columns]
+        return df[self.passthrough + PRED_COLS]
+
+    def predict_csv(self) -> Tuple[float, float, float]:
+        mode = self.cfg.mode
+        if mode not in {"predict", "benchmark"}:
+            raise ValueError(f"mode inválido: {mode!r} (use 'predict' ou 'benchmark').")
+        bench = mode == "benchmark"
+        if not self.cfg.input_csv or not self.cfg.output_csv:
+            raise ValueError("predict_csv requer input_csv e output_csv na configuração.")
+
+        out_path = Path(self.cfg.output_csv)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # acumuladores (memória limitada: apenas somas, exceto a quebra por classe no benchmark)
+        n_total = 0
+        n_chunks = 0
+        gk_ns_total = 0
+        s2_ms_total = 0.0
+        gk_rows_ms: List[float] = []
+        s2_per_class: Dict[str, Dict[str, Any]] = {}
+
+        # ler -> rotear -> pontuar -> anexar, bloco a bloco
+        for df in self._iter_input():
+            n = df.shape[0]
+            if n == 0:
+                continue
+            st = self._predict_frame(df, bench)
+            self._output_frame(df).to_csv(out_path, index=False, mode="w" if n_chunks == 0 else "a", header=(n_chunks == 0))
+
+            n_total += n
+            n_chunks += 1
+            gk_ns_total += st["gk_ns"]
+            s2_ms_total += float(np.sum(st["stage2_times"]))
+            if bench:
+                gk_rows_ms.extend(dt / 1e6 / n for dt in st["gk_samples_ns"])
+                self._accumulate_stage2(s2_per_class, st["gk_mapped"], st["spec_used"], st["stage2_times"])
+
+        if n_total == 0:
+            raise ValueError("input_csv não possui linhas.")
+
+        # métricas de latência agregadas (média ponderada por linha entre blocos)
+        gk_ms = (gk_ns_total / 1e6) / n_total
+        stage2_ms = s2_ms_total / n_total
         total_ms = gk_ms + stage2_ms
 
-        # 5) salvar CSV de saída
-        out = df.copy()
-        out["pred_gatekeeper"] = gk_pred
-        out["pred_gatekeeper_mapped"] = gk_mapped  # novo: útil p/ depuração e avaliação
-        out["pred_final"] = final_pred
-        out["specialist_model"] = spec_used
-        out["specialist_featureset"] = spec_set
-        out["latency_ms_stage1"] = round(gk_ms, 6)
-        out["latency_ms_stage2"] = [round(x, 6) for x in stage2_times]
-        out["latency_ms_total_est"] = round(total_ms, 6)
-
-        Path(self.cfg.output_csv).parent.mkdir(parents=True, exist_ok=True)
-        out.to_csv(self.cfg.output_csv, index=False)
-        logger.success(f"Predições salvas em {self.cfg.output_csv}")
+        logger.success(f"Predições salvas em {out_path} ({n_total} linhas, {n_chunks} bloco(s))")
+
+        if bench:
+            gk_arr = np.asarray(gk_rows_ms, dtype=np.float64)
+            report = {
+                "mode": "benchmark",
+                "stage2_mode": self.cfg.stage2_mode,
+                "n_rows": int(n_total),
+                "n_chunks": int(n_chunks),
+                "gatekeeper": {
+                    "repeats": GK_BENCH_REPEATS,
+                    "ms_per_row_best": float(gk_arr.min()),
+                    "ms_per_row_median": float(np.median(gk_arr)),
+                },
+                "stage2": {
+                    "repeats": S2_BENCH_REPEATS,
+                    "ms_per_row_mean": stage2_ms,
+                    "per_class": self._stage2_report(s2_per_class),
+                },
+                "total_ms_per_row": total_ms,
+            }
+            rep_path = Path(self.cfg.benchmark_json or out_path.with_suffix(".latency.json"))
+            rep_path.parent.mkdir(parents=True, exist_ok=True)
+            rep_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+            logger.success(f"Relatório de latência (benchmark) salvo em {rep_path}")
+
         logger.info(
-            f"Latência média — Gatekeeper: {gk_ms:.6f} ms | "
+            f"Latência média ({mode}) — Gatekeeper: {gk_ms:.6f} ms | "
             f"Especialista: {stage2_ms:.6f} ms | Total: {total_ms:.6f} ms/linha"
         )
         return gk_ms, stage2_ms, total_ms
+
+    @staticmethod
+    def _accumulate_stage2(
+        acc: Dict[str, Dict[str, Any]], gk_mapped: np.ndarray, spec_used: List[str], stage2_times: np.ndarray
+    ) -> None:
+        """Acumula tempos da etapa 2 por classe roteada (modo benchmark, entre blocos)."""
+        used = np.asarray(spec_used, dtype=object)
+        for cls, rows in TwoStageInferencer._group_rows(gk_mapped):
+            slot = acc.setdefault(str(cls), {"specialist_model": str(used[rows[0]]), "times": []})
+            slot["times"].append(stage2_times[rows].astype(np.float32))
+
+    @staticmethod
+    def _stage2_report(acc: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Quebra de latência da etapa 2 por classe roteada (modo benchmark)."""
+        per_class: Dict[str, Any] = {}
+        for cls, slot in acc.items():
+            t = np.concatenate(slot["times"]).astype(np.float64)
+            per_class[cls] = {
+                "rows": int(t.size),
+                "specialist_model": slot["specialist_model"],
+                "ms_per_row_mean": float(np.mean(t)),
+                "ms_per_row_p50": float(np.percentile(t, 50)),
+                "ms_per_row_p99": float(np.percentile(t, 99)),
+            }
+        return per_class
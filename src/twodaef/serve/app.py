@@ -0,0 +1,237 @@
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Tuple, Union, Deque
+
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, Body, HTTPException
+from loguru import logger
+
+from twodaef.infer.two_stage import TwoStageInferencer
+
+# colunas devolvidas por fluxo
+OUTPUT_COLS = [
+    "pred_gatekeeper",
+    "pred_gatekeeper_mapped",
+    "pred_final",
+    "specialist_model",
+    "specialist_featureset",
+]
+
+
+@dataclass
+class ServeConfig:
+    max_batch_size: int = 1024     # teto de fluxos por micro-lote
+    max_wait_ms: float = 2.0       # janela de coalescência após o 1º pedido do lote
+    stats_window: int = 10000      # nº de amostras recentes usadas nos percentis
+
+
+class LatencyStats:
+    """Janela deslizante de amostras de latência (ms) por estágio, com percentis sob demanda."""
+
+    def __init__(self, window: int):
+        self.samples: Dict[str, Deque[float]] = {}
+        self.window = window
+
+    def add(self, name: str, value_ms: float) -> None:
+        self.samples.setdefault(name, deque(maxlen=self.window)).append(float(value_ms))
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name, dq in self.samples.items():
+            if not dq:
+                continue
+            arr = np.fromiter(dq, dtype=np.float64)
+            out[name] = {
+                "n": int(arr.size),
+                "mean": float(arr.mean()),
+                "p50": float(np.percentile(arr, 50)),
+                "p95": float(np.percentile(arr, 95)),
+                "p99": float(np.percentile(arr, 99)),
+            }
+        return out
+
+
+class MicroBatcher:
+    """
+    Coalesce pedidos concorrentes em micro-lotes: o 1º pedido abre uma janela de
+    `max_wait_ms`; o lote fecha ao fim da janela ou ao atingir `max_batch_size` fluxos.
+    Cada lote é pontuado numa única chamada ao TwoStageInferencer (fora do event loop);
+    se a chamada falhar, os pedidos do lote são re-pontuados um a um.
+    """
+
+    def __init__(self, inferencer: TwoStageInferencer, cfg: ServeConfig):
+        self.inf = inferencer
+        self.cfg = cfg
+        self.stats = LatencyStats(cfg.stats_window)
+        self.queue: asyncio.Queue[Tuple[pd.DataFrame, asyncio.Future, float]] = asyncio.Queue()
+        self._pending: Tuple[pd.DataFrame, asyncio.Future, float] | None = None  # excedeu o lote anterior
+        self._task: asyncio.Task | None = None
+        self.n_batches = 0
+        self.n_flows = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _frame(self, records: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Fluxos de um pedido -> DataFrame float32 na união de features, com fill_missing nas
+        chaves ausentes do pedido: o resultado não depende dos vizinhos no micro-lote.
+        Valor não numérico => ValueError (422) só para este pedido.
+        """
+        df = pd.DataFrame.from_records(records)
+        return df.reindex(columns=self.inf.feature_union, fill_value=self.inf.cfg.fill_missing).astype(np.float32)
+
+    async def submit(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        frame = self._frame(records)
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self.queue.put((frame, fut, time.perf_counter()))
+        return await fut
+
+    async def _collect(self) -> List[Tuple[pd.DataFrame, asyncio.Future, float]]:
+        first, self._pending = self._pending or await self.queue.get(), None
+        batch = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.cfg.max_wait_ms / 1000.0
+        while size < self.cfg.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if size + len(item[0]) > self.cfg.max_batch_size:
+                self._pending = item  # abre o próximo lote (max_batch_size é teto rígido)
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _score(self, frames: List[pd.DataFrame]) -> Tuple[pd.DataFrame, Dict[str, Any], float]:
+        t0 = time.perf_counter()
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        st = self.inf.predict_frame(df)
+        return df[OUTPUT_COLS], st, (time.perf_counter() - t0) * 1000.0
+
+    def _record(self, st: Dict[str, Any], batch_ms: float) -> None:
+        n = st["n"]
+        self.n_batches += 1
+        self.n_flows += n
+        self.stats.add("batch_size", n)
+        self.stats.add("batch_ms", batch_ms)
+        self.stats.add("stage1_ms_per_row", st["gk_ns"] / 1e6 / n)
+        self.stats.add("stage2_ms_per_row", float(np.mean(st["stage2_times"])))
+
+    async def _rescore_each(self, batch: List[Tuple[pd.DataFrame, asyncio.Future, float]]) -> None:
+        # lote falhou: pontua pedido a pedido, para o erro chegar só a quem enviou o fluxo inválido
+        loop = asyncio.get_running_loop()
+        for frame, fut, t_enq in batch:
+            try:
+                res, st, batch_ms = await loop.run_in_executor(None, self._score, [frame])
+            except Exception as e:
+                logger.warning(f"Pedido rejeitado ({len(frame)} fluxo(s)): {e}")
+                if not fut.done():
+                    fut.set_exception(e)
+                continue
+            self._record(st, batch_ms)
+            self.stats.add("request_ms", (time.perf_counter() - t_enq) * 1000.0)
+            if not fut.done():
+                fut.set_result(res.to_dict(orient="records"))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            t_start = time.perf_counter()
+            try:
+                res, st, batch_ms = await loop.run_in_executor(None, self._score, [f for f, _, _ in batch])
+            except Exception as e:
+                if len(batch) > 1:
+                    logger.warning(f"Falha ao pontuar micro-lote ({e}); re-pontuando {len(batch)} pedidos um a um")
+                    await self._rescore_each(batch)
+                    continue
+                if isinstance(e, ValueError):  # erro do cliente (422): sem traceback
+                    logger.warning(f"Pedido rejeitado ({len(batch[0][0])} fluxo(s)): {e}")
+                else:
+                    logger.exception(f"Falha ao pontuar pedido: {e}")
+                _, fut, _ = batch[0]
+                if not fut.done():
+                    fut.set_exception(e)
+                continue
+
+            self._record(st, batch_ms)
+
+            rows = res.to_dict(orient="records")
+            t_done = time.perf_counter()
+            i = 0
+            for frame, fut, t_enq in batch:
+                self.stats.add("queue_wait_ms", (t_start - t_enq) * 1000.0)
+                self.stats.add("request_ms", (t_done - t_enq) * 1000.0)
+                if not fut.done():
+                    fut.set_result(rows[i:i + len(frame)])
+                i += len(frame)
+
+
+def _to_builtin(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # numpy -> tipos nativos (serialização JSON)
+    return [{k: (v.item() if isinstance(v, np.generic) else v) for k, v in r.items()} for r in rows]
+
+
+def create_app(inferencer: TwoStageInferencer, cfg: ServeConfig | None = None) -> FastAPI:
+    cfg = cfg or ServeConfig()
+    batcher = MicroBatcher(inferencer, cfg)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        batcher.start()
+        logger.info(f"Micro-batching ativo (max_batch_size={cfg.max_batch_size}, max_wait_ms={cfg.max_wait_ms})")
+        yield
+        await batcher.stop()
+        inferencer.close()  # thread pool da etapa 2 (n_workers > 1)
+
+    app = FastAPI(title="2D-AEF — inferência 2 estágios", lifespan=lifespan)
+    app.state.batcher = batcher
+
+    @app.get("/health")
+    async def health() -> Dict[str, Any]:
+        return {"status": "ok", "specialists": sorted(inferencer.spec_map.keys())}
+
+    @app.post("/predict")
+    async def predict(
+        payload: Union[Dict[str, Any], List[Dict[str, Any]]] = Body(...)
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Aceita um fluxo (objeto JSON) ou um lote (lista de objetos) com as colunas de features."""
+        single = isinstance(payload, dict)
+        records = [payload] if single else payload
+        if not records:
+            raise HTTPException(status_code=422, detail="Lote vazio.")
+        try:
+            rows = _to_builtin(await batcher.submit(records))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return rows[0] if single else rows
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, Any]:
+        return {
+            "batches": batcher.n_batches,
+            "flows": batcher.n_flows,
+            "percentiles": batcher.stats.summary(),  # batch_size + latências (ms) por estágio
+        }
+
+    return app
@@ -0,0 +1,131 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+# parâmetros de paralelismo não alteram o resultado do candidato => fora da chave
+_THREAD_PARAMS = {"n_jobs", "thread_count", "nthread", "num_threads"}
+
+
+def hash_training_data(X: pd.DataFrame, y: np.ndarray) -> str:
+    """Hash de conteúdo dos dados de treino (colunas + valores + rótulos)."""
+    h = hashlib.sha256()
+    h.update("\x1f".join(map(str, X.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(np.ascontiguousarray(y).tobytes())
+    return h.hexdigest()
+
+
+def model_params_signature(model: Any) -> str:
+    """Parâmetros da factory do modelo (get_params) em JSON estável, sem os de threads."""
+    try:
+        params = model.get_params()
+    except Exception:
+        params = {"repr": repr(model)}
+    params = {k: v for k, v in params.items() if k not in _THREAD_PARAMS}
+    return json.dumps({"class": type(model).__name__, "params": params}, sort_keys=True, default=str)
+
+
+class CandidateCache:
+    """
+    Cache em disco, endereçado por conteúdo, das avaliações de candidatos (modelo, feature set).
+    Chave = sha256(hash dos dados, seed/test_size do split, amostra, feature list ordenada,
+    parâmetros da factory). Cada entrada é um JSON (F1 por classe, latência); com `store_models`,
+    os modelos finais dos especialistas (amostra "final") guardam também o modelo ajustado (.joblib),
+    relido por `load_model` nas re-execuções. Evicção por idade e por tamanho total (LRU pelo mtime).
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        store_models: bool = False,
+        max_mb: Optional[float] = 2048.0,
+        max_age_days: Optional[float] = 30.0,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.store_models = store_models
+        self.max_bytes = None if max_mb is None else int(max_mb * 1024 * 1024)
+        self.max_age_s = None if max_age_days is None else float(max_age_days) * 86400.0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(context: str, model_key: str, features: List[str], params: str) -> str:
+        payload = json.dumps(
+            {"context": context, "model_key": model_key, "features": sorted(features), "params": params},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        p = self._path(key, ".json")
+        if not p.exists():
+            self.misses += 1
+            return None
+        try:
+            entry = json.loads(p.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Entrada de cache ilegível ({p}): {e}")
+            self.misses += 1
+            return None
+        os.utime(p)  # marca acesso (LRU)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any], model: Any = None) -> None:
+        p = self._path(key, ".json")
+        p.parent.mkdir(parents=True, exist_ok=True)
+        if model is not None and self.store_models:
+            joblib.dump(model, self._path(key, ".joblib"))
+        tmp = p.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(entry), encoding="utf-8")
+        tmp.replace(p)  # escrita atômica
+
+    def load_model(self, key: str) -> Any:
+        p = self._path(key, ".joblib")
+        return joblib.load(p) if p.exists() else None
+
+    def evict(self) -> int:
+        """Remove entradas mais velhas que max_age e, se preciso, as menos usadas até caber em max_mb."""
+        now = time.time()
+        entries = []
+        for p in self.root.glob("*/*.json"):
+            files = [p] + [f for f in [p.with_suffix(".joblib")] if f.exists()]
+            st = p.stat()
+            entries.append((st.st_mtime, sum(f.stat().st_size for f in files), files))
+
+        removed = 0
+        keep = []
+        for mtime, size, files in entries:
+            if self.max_age_s is not None and now - mtime > self.max_age_s:
+                for f in files:
+                    f.unlink(missing_ok=True)
+                removed += 1
+            else:
+                keep.append((mtime, size, files))
+
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in keep)
+            for mtime, size, files in sorted(keep, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                for f in files:
+                    f.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"Cache de candidatos: {removed} entrada(s) removida(s) em {self.root}")
+        return removed
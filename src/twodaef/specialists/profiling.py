@@ -0,0 +1,99 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Sequence
+
+import time
+
+import numpy as np
+
+# tamanhos de lote perfilados por padrão ("full" = validação inteira)
+DEFAULT_BATCH_SIZES: List[str] = ["1", "32", "1024", "full"]
+
+
+def profile_latency(
+    predict_fn: Callable[[np.ndarray], Any],
+    X: np.ndarray,
+    batch_sizes: Sequence[str] = DEFAULT_BATCH_SIZES,
+    warmup: int = 2,
+    repeats: int = 30,
+    max_rows_per_point: int = 200_000,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Latência de `predict_fn` em vários tamanhos de lote (linhas de X, em ciclo).
+    Por ponto: `warmup` chamadas descartadas + até `repeats` cronometradas (limitadas a
+    ~`max_rows_per_point` linhas no total); devolve p50/p99 por chamada e por linha (ms).
+    """
+    n = X.shape[0]
+    out: Dict[str, Dict[str, float]] = {}
+    if n == 0:
+        return out
+    for bs in batch_sizes:
+        b = n if bs == "full" else min(int(bs), n)
+        reps = max(3, min(repeats, max_rows_per_point // b))
+        # lotes distintos (janelas consecutivas) para não medir só a 1ª linha
+        starts = (np.arange(warmup + reps) * b) % max(1, n - b + 1)
+        times = np.empty(reps, dtype=np.float64)
+        for i, s in enumerate(starts):
+            Xb = X[s:s + b]
+            t0 = time.perf_counter_ns()
+            predict_fn(Xb)
+            dt = time.perf_counter_ns() - t0
+            if i >= warmup:
+                times[i - warmup] = dt / 1e6
+        p50, p99 = np.percentile(times, [50, 99])
+        out[str(bs)] = {
+            "batch_size": int(b),
+            "repeats": int(reps),
+            "p50_ms": float(p50),
+            "p99_ms": float(p99),
+            "p50_ms_per_row": float(p50 / b),
+            "p99_ms_per_row": float(p99 / b),
+        }
+    return out
+
+
+def _latency_vector(row: Dict[str, Any], batch_sizes: Sequence[str]) -> List[float]:
+    # um valor por lote pedido (mesmo comprimento para todas as linhas); sem perfil => latency_ms
+    prof = row.get("latency_profile") or {}
+    if batch_sizes and all(str(b) in prof for b in batch_sizes):
+        return [prof[str(b)]["p99_ms_per_row"] for b in batch_sizes]
+    return [row["latency_ms"]] * max(1, len(batch_sizes))
+
+
+def pareto_front(
+    table: List[Dict[str, Any]],
+    k_idx: int,
+    est_cost: Dict[str, float],
+    batch_sizes: Sequence[str] = (),
+) -> List[Dict[str, Any]]:
+    """
+    Frente de Pareto da classe k: maximiza F1_k e minimiza est_cost do feature set e a
+    latência p99/linha em *todos* os lotes de `batch_sizes` (um ponto só é dominado se outro
+    for tão bom em todos os objetivos e melhor em algum). Ordenada por F1_k desc.
+    """
+    pts = []
+    for row in table:
+        lat = _latency_vector(row, batch_sizes)
+        cost = float(est_cost.get(row["feature_set_name"], row["k"]))
+        pts.append((row, np.asarray([-row["f1"][k_idx], cost, *lat], dtype=np.float64)))
+
+    front = []
+    for row, v in pts:
+        dominated = any(np.all(w <= v) and np.any(w < v) for _, w in pts)
+        if dominated:
+            continue
+        point = {
+            "model_key": row["model_key"],
+            "feature_set_name": row["feature_set_name"],
+            "k": row["k"],
+            "f1_k": row["f1"][k_idx],
+            "est_cost": float(est_cost.get(row["feature_set_name"], row["k"])),
+            "latency_ms": row["latency_ms"],
+        }
+        if row.get("latency_profile"):
+            point["latency_profile"] = row["latency_profile"]
+        # repetições exatas (ex.: feature sets duplicados no pool) ficam uma vez só
+        if not any(p["model_key"] == point["model_key"] and p["f1_k"] == point["f1_k"]
+                   and p["est_cost"] == point["est_cost"] and p["latency_ms"] == point["latency_ms"] for p in front):
+            front.append(point)
+    front.sort(key=lambda p: (-p["f1_k"], p["latency_ms"]))
+    return front
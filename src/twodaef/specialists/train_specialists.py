@@ -1,8 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Sequence, Tuple
+from contextlib import nullcontext
+from functools import partial
 import json
+import os
+import tempfile
 import time
 import importlib
 
@@ -13,39 +17,86 @@ from loguru import logger
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
 from sklearn.preprocessing import LabelEncoder
+from joblib import Parallel, delayed
+from threadpoolctl import threadpool_limits
 
 from twodaef.utils.metrics import f1_per_class
+from twodaef.specialists.cache import CandidateCache, hash_training_data, model_params_signature
+from twodaef.specialists.profiling import pareto_front, profile_latency
+from twodaef.infer.adapters import make_adapter
+from twodaef.utils.dataset import ColumnarDataset, is_dataset
+from twodaef.utils.binning import bin_codes, quantile_edges
+from twodaef.utils.sampling import stratified_subsample
 
 # ---------- Modelo Factory (dinâmico) ----------
-def _available_models() -> Dict[str, Any]:
+def _available_models(n_threads: int | None = None) -> Dict[str, Any]:
+    # n_threads: orçamento explícito de threads por modelo (None => padrão de cada biblioteca)
     models: Dict[str, Any] = {}
     # Try LightGBM
     if importlib.util.find_spec("lightgbm"):
         from lightgbm import LGBMClassifier
+        lgbm_thr = {"n_jobs": n_threads} if n_threads else {}
+        # deterministic + force_row_wise: mesmo modelo com qualquer nº de threads (serial == --n_jobs)
         models["lgbm"] = lambda: LGBMClassifier(
-            n_estimators=300, learning_rate=0.05, num_leaves=63, subsample=0.8, colsample_bytree=0.8
+            n_estimators=300, learning_rate=0.05, num_leaves=63, subsample=0.8, colsample_bytree=0.8,
+            deterministic=True, force_row_wise=True, random_state=42, **lgbm_thr
         )
     # Try XGBoost
     if importlib.util.find_spec("xgboost"):
         from xgboost import XGBClassifier
         models["xgb"] = lambda: XGBClassifier(
             n_estimators=400, max_depth=8, learning_rate=0.05, subsample=0.8, colsample_bytree=0.8,
-            tree_method="hist", eval_metric="mlogloss", n_jobs=0
+            tree_method="hist", eval_metric="mlogloss", n_jobs=n_threads or 0, random_state=42
         )
     # Try CatBoost
     if importlib.util.find_spec("catboost"):
         from catboost import CatBoostClassifier
         models["cat"] = lambda: CatBoostClassifier(
-            iterations=500, depth=8, learning_rate=0.05, loss_function="MultiClass", verbose=False
+            iterations=500, depth=8, learning_rate=0.05, loss_function="MultiClass", verbose=False,
+            thread_count=n_threads or -1, random_seed=42
         )
-    # Always have sklearn fallbacks
-    models["sk_hgb"] = lambda: HistGradientBoostingClassifier(max_depth=None, learning_rate=0.1)
-    models["sk_rf"]  = lambda: RandomForestClassifier(n_estimators=300, n_jobs=-1, random_state=42)
+    # Always have sklearn fallbacks (HGB usa OpenMP: limitado via threadpoolctl nos workers)
+    models["sk_hgb"] = lambda: HistGradientBoostingClassifier(max_depth=None, learning_rate=0.1, random_state=42)
+    models["sk_rf"]  = lambda: RandomForestClassifier(n_estimators=300, n_jobs=n_threads or -1, random_state=42)
     return models
 
+# parâmetro que fixa o nº de árvores de cada booster (early stopping / re-treino final)
+_N_ESTIMATORS_PARAM = {"lgbm": "n_estimators", "xgb": "n_estimators", "cat": "iterations"}
+
+def _fit_model(
+    clf: Any,
+    mkey: str,
+    X: pd.DataFrame,
+    y: np.ndarray,
+    eval_set: Tuple[pd.DataFrame, np.ndarray] | None = None,
+    early_stopping_rounds: int | None = None,
+) -> int | None:
+    """
+    Ajusta `clf`. Para boosters (lgbm/xgb/cat) com `early_stopping_rounds`, usa `eval_set`
+    como critério de parada e devolve o nº de árvores escolhido; nos demais casos, None.
+    """
+    if not early_stopping_rounds or eval_set is None or mkey not in _N_ESTIMATORS_PARAM:
+        clf.fit(X, y)
+        return None
+    Xv, yv = eval_set
+    if mkey == "lgbm":
+        import lightgbm
+        clf.fit(X, y, eval_set=[(Xv, yv)], callbacks=[lightgbm.early_stopping(early_stopping_rounds, verbose=False)])
+        best = clf.best_iteration_  # 1-based
+    elif mkey == "xgb":
+        clf.set_params(early_stopping_rounds=early_stopping_rounds)
+        if np.unique(y).size <= 2:
+            clf.set_params(eval_metric="logloss")  # mlogloss da factory não vale para o objetivo binário
+        clf.fit(X, y, eval_set=[(Xv, yv)], verbose=False)
+        best = clf.best_iteration + 1  # 0-based
+    else:
+        clf.fit(X, y, eval_set=(Xv, yv), early_stopping_rounds=early_stopping_rounds)
+        best = clf.get_best_iteration() + 1  # 0-based
+    return int(best) if best else None
+
 @dataclass
 class TrainConfig:
-    train_csv: str
+    train_csv: str  # CSV ou diretório do make-dataset (colunar float32, já limpo)
     target_col: str
     feature_pool_json: str
     out_dir: str = "artifacts/specialists"
@@ -54,6 +105,18 @@ class TrainConfig:
     seed: int = 42
     models: List[str] | None = None  # None => usa disponíveis
     max_features_per_set: int | None = None  # opcional: limitar k
+    n_jobs: int = 1  # >1 => candidatos avaliados em N processos (dados compartilhados via memmap)
+    search: str = "full"  # "full" (todos no treino completo) | "halving" (successive halving em amostras crescentes)
+    halving_min_samples: int = 2000  # tamanho da amostra estratificada da 1ª rodada
+    halving_eta: int = 3             # a cada rodada mantém ~1/eta dos candidatos e multiplica a amostra por eta
+    cache_dir: str | None = None     # cache persistente de avaliações (ex.: artifacts/cache/specialists); None => desligado
+    cache_models: bool = False       # guarda também o modelo final de cada especialista (re-uso sem re-treino)
+    cache_max_mb: float | None = 2048.0
+    cache_max_age_days: float | None = 30.0
+    profile_batch_sizes: List[str] | None = None  # perfil de latência da frente de Pareto (ex.: 1,32,1024,full); None/[] => desligado
+    profile_repeats: int = 30
+    early_stopping_rounds: int | None = None  # boosters: para na validação (X_va) e reusa o nº de árvores no re-treino final
+    search_bins: int | None = None  # ex.: 255 => busca numa matriz pré-binada uint8 (>256 => uint16); re-treino final em float
 
 def _load_feature_pool(path: str) -> List[Dict[str, Any]]:
     d = json.loads(Path(path).read_text(encoding="utf-8"))
@@ -62,22 +125,430 @@ def _load_feature_pool(path: str) -> List[Dict[str, Any]]:
 def _subset_columns(df: pd.DataFrame, feats: List[str]) -> List[str]:
     return [c for c in feats if c in df.columns and pd.api.types.is_numeric_dtype(df[c])]
 
+def _evaluate_candidate(
+    mkey: str,
+    fs_name: str,
+    feats: List[str],
+    cols: np.ndarray,
+    X_tr: np.ndarray,
+    y_tr: np.ndarray,
+    X_va: np.ndarray,
+    y_va: np.ndarray,
+    n_classes: int,
+    n_threads: int | None = None,
+    profile: Sequence[str] | None = None,
+    profile_repeats: int = 30,
+    early_stopping_rounds: int | None = None,
+) -> Dict[str, Any]:
+    """
+    Treina o candidato 1x e devolve F1 de todas as classes + latência (ms/amostra) na validação.
+    X_tr/X_va são arrays (possivelmente memmap) sobre o universo; `cols` seleciona o feature set.
+    Com `n_threads`, o modelo e as libs OpenMP/BLAS do processo ficam limitados a esse orçamento.
+    Com `profile` (tamanhos de lote), mede também p50/p99 pelo adaptador da inferência
+    (array float32) em cada lote, com warm-up (`row["latency_profile"]`).
+    Com `early_stopping_rounds`, boosters param na validação; o nº de árvores vai em `row["n_estimators"]`.
+    """
+    limits = threadpool_limits(limits=n_threads) if n_threads else nullcontext()
+    with limits:
+        clf = _available_models(n_threads)[mkey]()
+        if mkey == "lgbm" and np.issubdtype(X_tr.dtype, np.integer):
+            # matriz binada: Dataset do universo construído 1x, feature set via restrição de interação
+            clf, n_est = _fit_lgbm_binned(clf, cols, X_tr, y_tr, X_va, y_va, n_classes, early_stopping_rounds)
+            predict_fn, Xp = partial(_lgbm_binned_predict, clf), X_va  # o Booster lê o universo inteiro
+        else:
+            Xv = pd.DataFrame(X_va[:, cols], columns=feats)
+            n_est = _fit_model(
+                clf, mkey, pd.DataFrame(X_tr[:, cols], columns=feats), y_tr, (Xv, y_va), early_stopping_rounds
+            )
+            predict_fn, Xp = clf.predict, Xv
+
+        # Predição cronometrada (ms/amostra) + F1 por classe
+        t0 = time.perf_counter()
+        y_pred = predict_fn(Xp)
+        dt = (time.perf_counter() - t0)
+
+        prof = None
+        if profile:
+            if isinstance(Xp, pd.DataFrame):
+                predict_fn = make_adapter(mkey, clf, feats).predict
+                Xp = X_va[:, cols]
+            prof = profile_latency(predict_fn, np.ascontiguousarray(Xp, dtype=np.float32), profile, repeats=profile_repeats)
+    latency_ms = (dt / max(1, X_va.shape[0])) * 1000.0
+
+    f1_dict = f1_per_class(y_va, np.asarray(y_pred).ravel())
+    row = {
+        "model_key": mkey,
+        "feature_set_name": fs_name,
+        "k": int(len(feats)),
+        "f1": [float(f1_dict.get(c, 0.0)) for c in range(n_classes)],
+        "latency_ms": latency_ms,
+        "features": feats,
+    }
+    if n_est is not None:
+        row["n_estimators"] = n_est
+    if prof is not None:
+        row["latency_profile"] = prof
+    return row
+
+# Dataset LightGBM do universo binado (1 slot por processo): chave = memmap/array de treino da rodada
+_LGBM_BINNED: Dict[str, Any] = {}
+
+def _lgbm_params(clf: Any, n_classes: int) -> Tuple[Dict[str, Any], int]:
+    # parâmetros do LGBMClassifier da factory -> lightgbm.train (aliases nativos) + nº de árvores
+    skip = {"class_weight", "importance_type", "n_estimators", "objective"}
+    params = {k: v for k, v in clf.get_params().items() if k not in skip and v is not None}
+    if n_classes > 2:
+        params.update(objective="multiclass", num_class=n_classes)
+    else:
+        params["objective"] = "binary"
+    params.update(verbose=-1, feature_pre_filter=False)
+    return params, int(clf.get_params()["n_estimators"])
+
+def _lgbm_binned_datasets(
+    X_tr: np.ndarray, y_tr: np.ndarray, X_va: np.ndarray, y_va: np.ndarray, params: Dict[str, Any]
+) -> Tuple[Any, Any]:
+    """
+    Dataset de treino (e validação com `reference`) sobre o universo de códigos, construído uma
+    vez por processo e reaproveitado por todos os candidatos lgbm da rodada: os códigos já são os
+    bins (max_bin = faixa do dtype), então o LightGBM não re-bina nem copia por feature set.
+    """
+    import lightgbm
+
+    key = f"{getattr(X_tr, 'filename', None) or id(X_tr)}:{X_tr.shape}"
+    hit = _LGBM_BINNED.get("key") == key
+    if not hit:
+        ds_params = {**params, "max_bin": int(np.iinfo(X_tr.dtype).max) + 1}
+        tr = lightgbm.Dataset(X_tr, label=y_tr, params=ds_params, free_raw_data=True).construct()
+        va = lightgbm.Dataset(X_va, label=y_va, reference=tr, free_raw_data=True).construct()
+        _LGBM_BINNED.clear()
+        # guarda X_tr junto: mantém o id() estável enquanto a entrada existir
+        _LGBM_BINNED.update(key=key, X_tr=X_tr, tr=tr, va=va)
+    return _LGBM_BINNED["tr"], _LGBM_BINNED["va"]
+
+def _fit_lgbm_binned(
+    clf: Any,
+    cols: np.ndarray,
+    X_tr: np.ndarray,
+    y_tr: np.ndarray,
+    X_va: np.ndarray,
+    y_va: np.ndarray,
+    n_classes: int,
+    early_stopping_rounds: int | None = None,
+) -> Tuple[Any, int | None]:
+    """
+    Treina o candidato lgbm no Dataset binado compartilhado; `interaction_constraints=[cols]`
+    restringe os splits às colunas do feature set. Devolve (Booster, nº de árvores do early stopping).
+    """
+    import lightgbm
+
+    params, n_rounds = _lgbm_params(clf, n_classes)
+    tr, va = _lgbm_binned_datasets(X_tr, y_tr, X_va, y_va, params)
+    params["interaction_constraints"] = [[int(c) for c in cols]]
+    if early_stopping_rounds:
+        booster = lightgbm.train(
+            params, tr, n_rounds, valid_sets=[va],
+            callbacks=[lightgbm.early_stopping(early_stopping_rounds, verbose=False)],
+        )
+        return booster, int(booster.best_iteration) or None
+    return lightgbm.train(params, tr, n_rounds), None
+
+def _lgbm_binned_predict(booster: Any, X: np.ndarray) -> np.ndarray:
+    # mesma regra de classe do LGBMClassifier (rótulos já são os códigos 0..n_classes-1)
+    proba = booster.predict(X, num_iteration=booster.best_iteration or None)
+    if proba.ndim == 1:
+        return (proba > 0.5).astype(np.intp)
+    return np.argmax(proba, axis=1)
+
+def _as_array(X: pd.DataFrame | np.ndarray) -> np.ndarray:
+    # matriz binada (uint8/uint16) passa direto; dataset colunar (float32) fica em float32
+    # (metade da RAM/memmap); CSV segue em float64
+    if isinstance(X, np.ndarray):
+        return X
+    dt = np.float32 if (X.dtypes == np.float32).all() else np.float64
+    return X.to_numpy(dtype=dt)
+
+def _bin_features(
+    X_tr: pd.DataFrame, X_va: pd.DataFrame, max_bins: int
+) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+    """
+    Quantiza o universo de features 1x: bordas por quantis do treino (ou pontos médios entre
+    valores distintos, se houver <= max_bins), códigos uint8 (max_bins <= 256) ou uint16.
+    Treino e validação usam as mesmas bordas; os candidatos treinam em subconjuntos de colunas.
+    """
+    dtype = np.uint8 if max_bins <= 256 else np.uint16
+    n_cols = X_tr.shape[1]
+    codes_tr = np.empty((X_tr.shape[0], n_cols), dtype=dtype, order="F")
+    codes_va = np.empty((X_va.shape[0], n_cols), dtype=dtype, order="F")
+    edges: List[np.ndarray] = []
+    for j in range(n_cols):
+        v = X_tr.iloc[:, j].to_numpy(dtype=np.float64)
+        e = quantile_edges(v, max_bins)
+        edges.append(e)
+        codes_tr[:, j] = bin_codes(v, e, dtype)
+        codes_va[:, j] = bin_codes(X_va.iloc[:, j].to_numpy(), e, dtype)
+    return codes_tr, codes_va, edges
+
+def _to_memmap(arr: np.ndarray, path: Path) -> np.ndarray:
+    np.save(path, np.ascontiguousarray(arr))
+    return np.load(path, mmap_mode="r")
+
+def _restrict_profile(row: Dict[str, Any], profile: Sequence[str] | None) -> Dict[str, Any] | None:
+    """
+    Ajusta o `latency_profile` de uma entrada do cache aos lotes pedidos: corta os lotes a
+    mais e remove o perfil se nenhum foi pedido. None se faltar algum lote pedido.
+    """
+    prof = row.get("latency_profile") or {}
+    row = {k: v for k, v in row.items() if k != "latency_profile"}
+    if not profile:
+        return row
+    if set(profile) - set(prof):
+        return None
+    row["latency_profile"] = {str(b): prof[str(b)] for b in profile}
+    return row
+
+def _search_candidates(
+    jobs: List[Tuple[str, str, List[str]]],
+    cols_universe: List[str],
+    X_tr: pd.DataFrame | np.ndarray,
+    y_tr: np.ndarray,
+    X_va: pd.DataFrame | np.ndarray,
+    y_va: np.ndarray,
+    n_classes: int,
+    n_jobs: int,
+    tmp_dir: Path,
+    cache: CandidateCache | None = None,
+    cache_context: str = "",
+    profile: Sequence[str] | None = None,
+    profile_repeats: int = 30,
+    early_stopping_rounds: int | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Avalia os candidatos (model_key, feature_set_name, feats) em série ou em `n_jobs` processos.
+    Em paralelo, os dados vão para arquivos .npy abertos como memmap (não são picklados por
+    worker) e cada worker recebe núcleos // n_jobs threads. A ordem da tabela é a de `jobs`.
+    Com `cache`, só os candidatos ausentes são treinados; `cache_context` identifica dados/split/amostra.
+    `profile`/`early_stopping_rounds`: ver _evaluate_candidate.
+    """
+    table: List[Dict[str, Any] | None] = [None] * len(jobs)
+    keys: List[str | None] = [None] * len(jobs)
+    todo = list(range(len(jobs)))
+    if cache is not None:
+        avail = _available_models()
+        sigs = {m: model_params_signature(avail[m]()) for m in {j[0] for j in jobs}}
+        todo = []
+        seen: Dict[str, int] = {}
+        for i, (mkey, fs, feats) in enumerate(jobs):
+            keys[i] = cache.key(cache_context, mkey, feats, sigs[mkey])
+            if keys[i] in seen:
+                continue  # mesmo conjunto (ordenado) com outro nome: avaliado uma vez, copiado abaixo
+            seen[keys[i]] = i
+            hit = cache.get(keys[i])
+            if hit is not None:
+                hit = _restrict_profile(hit, profile)  # None => entrada sem o perfil pedido: reavalia
+            if hit is None:
+                todo.append(i)
+            else:
+                # nome do feature set e ordem das features vêm do pool atual
+                table[i] = {**hit, "feature_set_name": fs, "features": feats}
+        logger.info(f"Cache de candidatos: {len(jobs) - len(todo)} reaproveitado(s) (cache/duplicados), {len(todo)} a treinar")
+
+    pos = {c: j for j, c in enumerate(cols_universe)}
+    args = [(i, *jobs[i], np.asarray([pos[c] for c in jobs[i][2]], dtype=np.intp)) for i in todo]
+    if args:
+        Xtr_a = _as_array(X_tr)
+        Xva_a = _as_array(X_va)
+
+    if not args:
+        rows = []
+    elif n_jobs <= 1:
+        rows = [
+            _evaluate_candidate(
+                m, fs, fe, c, Xtr_a, y_tr, Xva_a, y_va, n_classes, None, profile, profile_repeats,
+                early_stopping_rounds,
+            )
+            for _, m, fs, fe, c in args
+        ]
+    else:
+        n_threads = max(1, (os.cpu_count() or 1) // n_jobs)
+        logger.info(f"Busca paralela: {n_jobs} processos x {n_threads} threads por modelo")
+        with tempfile.TemporaryDirectory(prefix="_memmap_", dir=tmp_dir) as tmp:
+            Xtr_m = _to_memmap(Xtr_a, Path(tmp) / "X_tr.npy")
+            Xva_m = _to_memmap(Xva_a, Path(tmp) / "X_va.npy")
+            del Xtr_a, Xva_a
+            # max_nbytes=None: sem auto-memmap do joblib (os arrays já são memmap, passados por referência)
+            rows = Parallel(n_jobs=n_jobs, backend="loky", max_nbytes=None)(
+                delayed(_evaluate_candidate)(
+                    m, fs, fe, c, Xtr_m, y_tr, Xva_m, y_va, n_classes, n_threads, profile, profile_repeats,
+                    early_stopping_rounds,
+                )
+                for _, m, fs, fe, c in args
+            )
+            del Xtr_m, Xva_m
+
+    for (i, *_), row in zip(args, rows):
+        if cache is not None:
+            cache.put(keys[i], row)
+        table[i] = row
+    if cache is not None:
+        for i, (_, fs, feats) in enumerate(jobs):
+            if table[i] is None:
+                table[i] = {**table[seen[keys[i]]], "feature_set_name": fs, "features": feats}
+        if args:
+            cache.evict()
+    return table  # type: ignore[return-value]
+
+def _halving_survivors(
+    table: List[Dict[str, Any]], n_classes: int, keep: int, est_cost: Dict[str, float] | None = None
+) -> List[int]:
+    """
+    Índices dos sobreviventes: round-robin sobre os rankings por classe (F1_k desc, depois
+    _tie_key) — o 1º de cada classe, depois o 2º, ... — até `keep` candidatos distintos.
+    O líder de cada classe sempre sobrevive (`keep` sobe até o nº de líderes distintos).
+    """
+    est_cost = est_cost or {}
+    rankings = [
+        sorted(range(len(table)), key=lambda i: (-table[i]["f1"][k], *_tie_key(table[i], est_cost)))
+        for k in range(n_classes)
+    ]
+    leaders = {order[0] for order in rankings if order}
+    keep = min(max(keep, len(leaders)), len(table))
+    chosen: Dict[int, None] = {}
+    pos = 0
+    while len(chosen) < keep:
+        for order in rankings:
+            chosen.setdefault(order[pos], None)
+            if len(chosen) >= keep:
+                break
+        pos += 1
+    return sorted(chosen)
+
+def _successive_halving(
+    jobs: List[Tuple[str, str, List[str]]],
+    cols_universe: List[str],
+    X_tr: pd.DataFrame | np.ndarray,
+    y_tr: np.ndarray,
+    X_va: pd.DataFrame | np.ndarray,
+    y_va: np.ndarray,
+    n_classes: int,
+    cfg: TrainConfig,
+    out_dir: Path,
+    cache: CandidateCache | None = None,
+    cache_context: str = "",
+    est_cost: Dict[str, float] | None = None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Successive halving: todos os candidatos numa amostra estratificada pequena do treino;
+    a cada rodada ficam ~1/eta dos candidatos no total (round-robin sobre os rankings por
+    classe: F1_k desc, depois k/est_cost/nome; o líder de cada classe sempre fica) e a
+    amostra cresce eta vezes. A poda para quando restam <= n_classes candidatos; só os
+    finalistas são treinados no treino completo (última rodada).
+    Devolve (tabela da rodada final, resumo das rodadas, linhas de todas as rodadas);
+    cada linha traz `halving_round`.
+    """
+    eta = max(2, int(cfg.halving_eta))
+    n_full = len(y_tr)
+    n_r = min(max(1, int(cfg.halving_min_samples)), n_full)
+    active = list(jobs)
+    rounds: List[Dict[str, Any]] = []
+    all_rows: List[Dict[str, Any]] = []
+    r = 0
+    while True:
+        # poucos candidatos para podar sem tirar o líder de alguma classe: vai direto ao treino completo
+        final = n_r >= n_full or len(active) <= n_classes
+        idx = np.arange(n_full) if final else stratified_subsample(y_tr, n_r, cfg.seed + r)
+        sample = "full" if final else f"strat:{n_r}:{cfg.seed + r}"
+        table = _search_candidates(
+            active, cols_universe, X_tr[idx] if isinstance(X_tr, np.ndarray) else X_tr.iloc[idx], y_tr[idx],
+            X_va, y_va, n_classes, cfg.n_jobs, out_dir,
+            cache, f"{cache_context}|sample={sample}", None, cfg.profile_repeats, cfg.early_stopping_rounds,
+        )
+        for row in table:
+            row["halving_round"] = r
+        all_rows.extend(table)
+        rounds.append({"round": r, "n_samples": int(idx.size), "n_candidates": len(active)})
+        logger.info(f"Halving — rodada {r}: {len(active)} candidatos em {idx.size} amostras")
+        if final:
+            return table, rounds, all_rows
+
+        keep = max(1, int(np.ceil(len(active) / eta)))
+        active = [active[i] for i in _halving_survivors(table, n_classes, keep, est_cost)]
+        n_r = min(n_full, n_r * eta)
+        r += 1
+
+def _tie_key(row: Dict[str, Any], est_cost: Dict[str, float]) -> Tuple[int, float, str, str]:
+    # desempate determinístico (não depende da latência medida): menos features, menor
+    # est_cost, depois nome do modelo / feature set
+    fs = row["feature_set_name"]
+    return (row["k"], float(est_cost.get(fs, row["k"])), row["model_key"], fs)
+
+def _select_best(
+    table: List[Dict[str, Any]], k_idx: int, est_cost: Dict[str, float] | None = None
+) -> Dict[str, Any] | None:
+    """Argmax de F1_k na tabela; empate (isclose) decidido por _tie_key (k, est_cost, nome)."""
+    if not table:
+        return None
+    est_cost = est_cost or {}
+    top = max(row["f1"][k_idx] for row in table)
+    tied = [row for row in table if np.isclose(row["f1"][k_idx], top)]
+    row = min(tied, key=lambda r: _tie_key(r, est_cost))
+    best = {
+        "model_key": row["model_key"],
+        "feature_set_name": row["feature_set_name"],
+        "k": row["k"],
+        "f1_k": row["f1"][k_idx],
+        "latency_ms": row["latency_ms"],
+        "features": row["features"],
+    }
+    if "halving_round" in row:
+        best["halving_round"] = row["halving_round"]
+    if "latency_profile" in row:
+        best["latency_profile"] = row["latency_profile"]
+    if "n_estimators" in row:
+        best["n_estimators"] = row["n_estimators"]
+    return best
+
+def _write_search_table(table: List[Dict[str, Any]], classes: List[str], path: Path) -> None:
+    rows = []
+    for r in table:
+        row = {"model_key": r["model_key"], "feature_set_name": r["feature_set_name"], "k": r["k"], "latency_ms": r["latency_ms"]}
+        if "halving_round" in r:
+            row["halving_round"] = r["halving_round"]
+        if "n_estimators" in r:
+            row["n_estimators"] = r["n_estimators"]
+        for bs, st in (r.get("latency_profile") or {}).items():
+            row[f"p50_ms_b{bs}"] = st["p50_ms"]
+            row[f"p99_ms_b{bs}"] = st["p99_ms"]
+        row.update({f"f1_{c}": v for c, v in zip(classes, r["f1"])})
+        rows.append(row)
+    out = pd.DataFrame(rows)
+    if "n_estimators" in out.columns:
+        out["n_estimators"] = out["n_estimators"].astype("Int64")  # vazio p/ modelos sem early stopping
+    out.to_csv(path, index=False, encoding="utf-8")
+
 def train_specialists(cfg: TrainConfig) -> Dict[str, Any]:
     # 1) Dados
-    df = pd.read_csv(cfg.train_csv)
-    assert cfg.target_col in df.columns, f"target_col {cfg.target_col} não existe em {cfg.train_csv}"
-    y_raw = df[cfg.target_col].values
-    # --- blacklist para evitar vazamentos ---
-    blacklist = {cfg.target_col, "Label", "label", "attack_cat", "Attack_cat", "id", "ID"}
-    X = df.drop(columns=[c for c in blacklist if c in df.columns])
-
-    # filtro numérico simples (mantém alinhado com MI do passo 2a)
-    X = X.select_dtypes(include=[np.number]).replace([np.inf, -np.inf], np.nan).dropna(axis=1, how="any")
-    cols_universe = X.columns.tolist()
+    if is_dataset(cfg.train_csv):
+        # dataset colunar: blacklist/filtro numérico/limpeza e LabelEncoder já aplicados na conversão
+        ds = ColumnarDataset(cfg.train_csv)
+        assert ds.target_col == cfg.target_col, f"dataset {cfg.train_csv} foi gerado com target_col {ds.target_col}"
+        X = ds.frame()
+        y = np.asarray(ds.y)
+        classes_str = ds.classes
+    else:
+        df = pd.read_csv(cfg.train_csv)
+        assert cfg.target_col in df.columns, f"target_col {cfg.target_col} não existe em {cfg.train_csv}"
+        y_raw = df[cfg.target_col].values
+        # --- blacklist para evitar vazamentos ---
+        blacklist = {cfg.target_col, "Label", "label", "attack_cat", "Attack_cat", "id", "ID"}
+        X = df.drop(columns=[c for c in blacklist if c in df.columns])
 
-    le = LabelEncoder()
-    y = le.fit_transform(y_raw)
-    classes_str = le.classes_.tolist()
+        # filtro numérico simples (mantém alinhado com MI do passo 2a)
+        X = X.select_dtypes(include=[np.number]).replace([np.inf, -np.inf], np.nan).dropna(axis=1, how="any")
+
+        le = LabelEncoder()
+        y = le.fit_transform(y_raw)
+        classes_str = le.classes_.tolist()
+    cols_universe = X.columns.tolist()
 
     X_tr, X_va, y_tr, y_va = train_test_split(X, y, test_size=cfg.test_size, random_state=cfg.seed, stratify=y)
 
@@ -100,73 +571,166 @@ def train_specialists(cfg: TrainConfig) -> Dict[str, Any]:
     logger.info(f"Modelos candidatos: {model_keys}")
     logger.info(f"Total de feature sets: {len(pool)}")
 
-    # 4) Busca do especialista por classe
+    # 4) Busca: cada candidato (modelo, feature set) é treinado e predito UMA vez;
+    #    o F1 de todas as classes vai para a tabela de resultados
     out_dir = Path(cfg.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
     results: Dict[str, Any] = {
         "classes": classes_str,
         "models_used": model_keys,
-        "specialists": {}  # class_name -> {model_key, feature_set_name, f1, latency_ms, model_path}
+        "specialists": {}  # class_name -> {model_key, feature_set_name, f1, latency_ms, model_id, model_path}
     }
 
+    jobs: List[Tuple[str, str, List[str]]] = []
+    for mkey in model_keys:
+        for f in pool:
+            # reinterseção com universo, em ordem canônica (a mesma da chave do cache): o modelo
+            # ajustado não depende da ordem das features no pool
+            feats = sorted(_subset_columns(X, f["features"]))
+            if len(feats) == 0:
+                continue
+            jobs.append((mkey, f["name"], feats))
+
+    profile = list(cfg.profile_batch_sizes or [])
+
+    cache: CandidateCache | None = None
+    cache_context = ""
+    if cfg.cache_dir:
+        cache = CandidateCache(cfg.cache_dir, cfg.cache_models, cfg.cache_max_mb, cfg.cache_max_age_days)
+        # chave: conteúdo dos dados + split (seed/test_size); a amostra é acrescentada por rodada
+        cache_context = f"data={hash_training_data(X, y)}|classes={classes_str}|split={cfg.seed}:{cfg.test_size}"
+        if cfg.early_stopping_rounds:
+            cache_context += f"|es={cfg.early_stopping_rounds}"
+        if cfg.search_bins:
+            cache_context += f"|bins={cfg.search_bins}"
+
+    # Matriz pré-binada (opcional): o universo é quantizado 1x e os candidatos treinam/validam
+    # em subconjuntos de colunas dos códigos; bordas salvas em <out_dir>/search_bins.npz
+    X_tr_s, X_va_s = X_tr, X_va
+    if cfg.search_bins:
+        X_tr_s, X_va_s, edges = _bin_features(X_tr, X_va, int(cfg.search_bins))
+        bins_path = out_dir / "search_bins.npz"
+        np.savez_compressed(
+            bins_path,
+            columns=np.asarray(cols_universe, dtype=str),
+            edges=np.concatenate(edges) if edges else np.empty(0),
+            offsets=np.cumsum([0] + [e.size for e in edges]),
+        )
+        raw_bytes = X_tr.shape[0] * X_tr.shape[1] * _as_array(X_tr.iloc[:1]).itemsize
+        results["search_binning"] = {
+            "max_bins": int(cfg.search_bins),
+            "dtype": str(X_tr_s.dtype),
+            "edges_path": str(bins_path),
+        }
+        logger.info(
+            f"Busca em matriz binada {X_tr_s.dtype} ({X_tr_s.nbytes / 2**20:.1f} MB vs {raw_bytes / 2**20:.1f} MB em float)"
+        )
+
+    # custo estimado de cada feature set (pool): desempate da seleção e objetivo da frente de Pareto
+    est_cost = {p["name"]: float(p["est_cost"]) for p in pool if "est_cost" in p}
+
+    if cfg.search == "halving":
+        table, rounds, all_rows = _successive_halving(
+            jobs, cols_universe, X_tr_s, y_tr, X_va_s, y_va, len(classes_str), cfg, out_dir, cache, cache_context, est_cost
+        )
+        results["search"] = {"mode": "halving", "eta": cfg.halving_eta, "rounds": rounds}
+    elif cfg.search == "full":
+        table = all_rows = _search_candidates(
+            jobs, cols_universe, X_tr_s, y_tr, X_va_s, y_va, len(classes_str), cfg.n_jobs, out_dir,
+            cache, f"{cache_context}|sample=full", None, cfg.profile_repeats, cfg.early_stopping_rounds,
+        )
+    else:
+        raise ValueError(f"search inválido: {cfg.search!r} (use 'full' ou 'halving').")
+
+    # Frente de Pareto por classe (F1_k x latência x est_cost): permite re-selecionar
+    # o especialista para outro orçamento de latência sem refazer a busca
+    fronts = [pareto_front(table, k_idx, est_cost) for k_idx in range(len(classes_str))]
+    if profile:
+        # perfil multi-ponto (opt-in) só dos candidatos de alguma frente, em série e depois da
+        # busca: sem concorrência com outros workers e sem custo para os dominados
+        on_front = [{(p["model_key"], p["feature_set_name"]) for p in front} for front in fronts]
+        idx = [i for i, r in enumerate(table) if any((r["model_key"], r["feature_set_name"]) in f for f in on_front)]
+        logger.info(f"Perfil de latência ({','.join(profile)}): {len(idx)} candidato(s) da frente de Pareto, em série")
+        prof_rows = _search_candidates(
+            [(table[i]["model_key"], table[i]["feature_set_name"], table[i]["features"]) for i in idx],
+            cols_universe, X_tr_s, y_tr, X_va_s, y_va, len(classes_str), 1, out_dir,
+            cache, f"{cache_context}|sample=full", profile, cfg.profile_repeats, cfg.early_stopping_rounds,
+        )
+        for i, row in zip(idx, prof_rows):
+            table[i]["latency_profile"] = row["latency_profile"]
+        # frente refeita com a latência p99/linha de cada lote, entre os candidatos da frente da classe
+        fronts = [
+            pareto_front([table[i] for i in idx if (table[i]["model_key"], table[i]["feature_set_name"]) in f],
+                         k_idx, est_cost, profile)
+            for k_idx, f in enumerate(on_front)
+        ]
+    results["pareto"] = {str(k_name): front for k_name, front in zip(classes_str, fronts)}
+
+    if cache is not None:
+        results["cache"] = {"dir": str(cache.root), "hits": cache.hits, "misses": cache.misses}
+
+    _write_search_table(all_rows, classes_str, out_dir / "search_results.csv")
+    logger.info(f"Avaliações de candidatos: {len(all_rows)} (tabela em {out_dir / 'search_results.csv'})")
+
+    # Re-treino final deduplicado: classes que escolheram o mesmo candidato (modelo, feature set)
+    # compartilham um único modelo treinado/salvo em <out_dir>/<model_key>__<feature_set>/model.joblib
+    results["models"] = {}  # model_id -> {model_key, feature_set_name, features, model_path, classes}
     for k_idx, k_name in enumerate(classes_str):
-        best: Dict[str, Any] | None = None
-
-        for mkey in model_keys:
-            model_fn = avail[mkey]
-
-            for f in pool:
-                feats = _subset_columns(X_tr.assign(**X_va), f["features"])  # reinterseção com universo
-                if len(feats) == 0:
-                    continue
-
-                clf = model_fn()
-                # Treina no subconjunto
-                clf.fit(X_tr[feats], y_tr)
-
-                # Predição + F1_k
-                y_pred = clf.predict(X_va[feats])
-                f1_dict = f1_per_class(y_va, y_pred)
-                f1_k = float(f1_dict.get(k_idx, 0.0))
-
-                # Latência média (ms/amostra) no conjunto de validação
-                t0 = time.perf_counter()
-                _ = clf.predict(X_va[feats])
-                dt = (time.perf_counter() - t0)
-                latency_ms = (dt / max(1, X_va.shape[0])) * 1000.0
-
-                cand = {
-                    "model_key": mkey,
-                    "feature_set_name": f["name"],
-                    "k": int(len(feats)),
-                    "f1_k": f1_k,
-                    "latency_ms": latency_ms,
-                    "features": feats,
-                }
-                if (best is None) or (f1_k > best["f1_k"]) or (np.isclose(f1_k, best["f1_k"]) and latency_ms < best["latency_ms"]):
-                    best = cand
-
-        # salvar o melhor modelo para a classe k
+        best = _select_best(table, k_idx, est_cost)
+
         if best is None:
             logger.warning(f"Nenhum especialista encontrado para classe {k_name}.")
             continue
 
-        # Re-treina no TR completo (opcional: TR+VA) e salva
-        final_model = avail[best["model_key"]]()
-        feats = best["features"]
-        final_model.fit(X[feats], y)  # treina no dataset completo para robustez
-
         class_name = str(k_name)
-        class_dir = out_dir / class_name
-        class_dir.mkdir(parents=True, exist_ok=True)
-        model_path = class_dir / "model.joblib"
-        joblib.dump(final_model, model_path)
+        model_id = f"{best['model_key']}__{best['feature_set_name']}"
+        shared = results["models"].get(model_id)
+        if shared is None:
+            # Re-treina no TR completo (opcional: TR+VA) e salva
+            final_model = avail[best["model_key"]]()
+            if best.get("n_estimators") and not cfg.search_bins:
+                # nº de árvores escolhido pelo early stopping da busca (na busca binada ele vale
+                # para os códigos, não para as features originais do re-treino: fica o padrão)
+                final_model.set_params(**{_N_ESTIMATORS_PARAM[best["model_key"]]: best["n_estimators"]})
+            feats = best["features"]
+            final_key = None
+            if cache is not None and cache.store_models:
+                # modelo final cacheado: mesmo candidato + nº de árvores sobre os mesmos dados
+                final_key = cache.key(f"{cache_context}|sample=final", best["model_key"], feats, model_params_signature(final_model))
+                cached_model = cache.load_model(final_key)
+            if final_key is not None and cached_model is not None:
+                final_model = cached_model
+                logger.info(f"Classe '{k_name}': modelo final {model_id} reaproveitado do cache")
+            else:
+                final_model.fit(X[feats], y)  # treina no dataset completo para robustez
+                if final_key is not None:
+                    cache.put(final_key, {"model_key": best["model_key"], "features": feats, "final": True}, final_model)
+
+            model_dir = out_dir / model_id
+            model_dir.mkdir(parents=True, exist_ok=True)
+            model_path = model_dir / "model.joblib"
+            joblib.dump(final_model, model_path)
+            shared = results["models"][model_id] = {
+                "model_key": best["model_key"],
+                "feature_set_name": best["feature_set_name"],
+                "features": feats,
+                "model_path": str(model_path),
+                "classes": [],
+            }
+        else:
+            logger.info(f"Classe '{k_name}': reaproveita o modelo de {shared['classes']} ({model_id})")
+        shared["classes"].append(class_name)
 
-        best["model_path"] = str(model_path)
+        best["model_id"] = model_id
+        best["model_path"] = shared["model_path"]
         results["specialists"][class_name] = best
         logger.success(f"Classe '{k_name}': {best['model_key']} + {best['feature_set_name']} (F1_k={best['f1_k']:.4f}, {best['k']} feats)")
 
+    if cache is not None and cache.store_models:
+        cache.evict()
+    logger.info(f"Modelos finais treinados: {len(results['models'])} para {len(results['specialists'])} classe(s)")
+
     # salva o mapa
     map_path = Path(cfg.map_path)
     map_path.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def quantile_edges(v: np.ndarray, max_bins: int) -> np.ndarray:
+    """
+    Bordas de quantização de uma coluna: pontos médios entre valores distintos se houver
+    <= max_bins deles (sem perda), senão quantis de mesma frequência (bordas repetidas removidas).
+    Códigos = np.searchsorted(bordas, v, side="right") em [0, max_bins).
+    """
+    v = np.asarray(v, dtype=np.float64)
+    u = np.unique(v)
+    if u.size <= max_bins:
+        return (u[:-1] + u[1:]) / 2.0
+    return np.unique(np.quantile(v, np.linspace(0.0, 1.0, max_bins + 1)[1:-1]))
+
+
+def bin_codes(v: np.ndarray, edges: np.ndarray, dtype=np.uint8) -> np.ndarray:
+    return np.searchsorted(edges, np.asarray(v, dtype=np.float64), side="right").astype(dtype, copy=False)
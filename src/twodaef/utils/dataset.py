@@ -0,0 +1,131 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.preprocessing import LabelEncoder
+
+from twodaef.utils.io import ensure_dir
+
+# colunas que nunca entram como feature (alvo/identificadores: evita vazamento)
+BLACKLIST = {"Label", "label", "attack_cat", "Attack_cat", "id", "ID"}
+
+DATASET_FORMAT = "twodaef-columnar-f32"
+META_FILE = "meta.json"
+
+
+def is_dataset(path: str | Path) -> bool:
+    """True se `path` é um diretório gerado por `make-dataset` (e não um CSV)."""
+    p = Path(path)
+    return p.is_dir() and (p / META_FILE).exists()
+
+
+def build_dataset(
+    csv_path: str | Path,
+    target_col: str,
+    out_dir: str | Path,
+    chunksize: int = 200_000,
+) -> Dict[str, Any]:
+    """
+    Converte um CSV de treino em dataset colunar float32 memory-mappable:
+      - X.npy: (n, p) float32 em ordem de colunas (Fortran), só features numéricas e finitas
+        (mesma limpeza do pool/especialistas: blacklist, select numérico, drop de colunas com inf/NaN);
+      - y.npy: rótulos codificados (int32, ordem do LabelEncoder);
+      - meta.json: esquema (colunas, classes, colunas descartadas, origem).
+    O CSV é lido em blocos: a memória de pico é a de um bloco, não a do arquivo.
+    """
+    out = ensure_dir(out_dir)
+    rows_path = out / "_rows.f32"
+    blacklist = BLACKLIST | {target_col}
+
+    cols: Optional[List[str]] = None
+    numeric: Optional[np.ndarray] = None
+    finite: Optional[np.ndarray] = None
+    labels: List[np.ndarray] = []
+    n = 0
+    with open(rows_path, "wb") as fh:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, low_memory=False):
+            if target_col not in chunk.columns:
+                raise ValueError(f"target_col {target_col} não existe em {csv_path}")
+            if cols is None:
+                cols = [c for c in chunk.columns if c not in blacklist]
+                numeric = np.ones(len(cols), dtype=bool)
+                finite = np.ones(len(cols), dtype=bool)
+            labels.append(chunk[target_col].to_numpy())
+            block = chunk[cols]
+            numeric &= np.fromiter((pd.api.types.is_numeric_dtype(block[c]) for c in cols), dtype=bool, count=len(cols))
+            arr = block.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32)
+            finite &= np.isfinite(arr).all(axis=0)
+            fh.write(np.ascontiguousarray(arr).tobytes())
+            n += arr.shape[0]
+    if cols is None:
+        raise ValueError(f"CSV vazio: {csv_path}")
+
+    keep = np.flatnonzero(numeric & finite)
+    if keep.size == 0:
+        rows_path.unlink(missing_ok=True)
+        raise ValueError("Nenhuma coluna numérica disponível após limpeza.")
+
+    # linhas (row-major, temporário) -> colunas (Fortran) em blocos
+    rows = np.memmap(rows_path, dtype=np.float32, mode="r", shape=(n, len(cols)))
+    X = np.lib.format.open_memmap(out / "X.npy", mode="w+", dtype=np.float32, shape=(n, keep.size), fortran_order=True)
+    for a in range(0, n, chunksize):
+        X[a:a + chunksize] = rows[a:a + chunksize][:, keep]
+    X.flush()
+    del X, rows
+    os.remove(rows_path)
+
+    le = LabelEncoder()
+    y = le.fit_transform(np.concatenate(labels)).astype(np.int32)
+    np.save(out / "y.npy", y)
+
+    meta = {
+        "format": DATASET_FORMAT,
+        "source_csv": str(csv_path),
+        "target_col": target_col,
+        "n_rows": int(n),
+        "columns": [cols[j] for j in keep],
+        "classes": [c.item() if isinstance(c, np.generic) else c for c in le.classes_],
+        "dropped_columns": {
+            "non_numeric": [c for c, ok in zip(cols, numeric) if not ok],
+            "non_finite": [c for c, ok, num in zip(cols, finite, numeric) if num and not ok],
+        },
+    }
+    (out / META_FILE).write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+    logger.success(f"Dataset colunar: {n} linhas x {keep.size} features em {out}")
+    return meta
+
+
+class ColumnarDataset:
+    """Dataset gerado por `build_dataset`: X/y abertos como memmap (sem carregar o arquivo)."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.meta: Dict[str, Any] = json.loads((self.path / META_FILE).read_text(encoding="utf-8"))
+        if self.meta.get("format") != DATASET_FORMAT:
+            raise ValueError(f"Formato de dataset desconhecido em {self.path}: {self.meta.get('format')!r}")
+        self.X: np.ndarray = np.load(self.path / "X.npy", mmap_mode="r")
+        self.y: np.ndarray = np.load(self.path / "y.npy", mmap_mode="r")
+        self.columns: List[str] = list(self.meta["columns"])
+        self.classes: List[Any] = list(self.meta["classes"])
+        self.target_col: str = self.meta["target_col"]
+
+    def frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """DataFrame float32 com `columns` (None => todas); só as colunas pedidas são lidas do disco."""
+        if columns is None:
+            return pd.DataFrame(np.asarray(self.X), columns=self.columns, copy=False)
+        pos = {c: j for j, c in enumerate(self.columns)}
+        missing = [c for c in columns if c not in pos]
+        if missing:
+            raise KeyError(f"Features ausentes no dataset {self.path}: {missing}")
+        idx = np.asarray([pos[c] for c in columns], dtype=np.intp)
+        return pd.DataFrame(np.take(self.X, idx, axis=1), columns=list(columns), copy=False)
+
+    def labels(self) -> np.ndarray:
+        """Rótulos originais (decodificados)."""
+        return np.asarray(self.classes).take(self.y)
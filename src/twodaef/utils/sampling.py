@@ -0,0 +1,108 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+def stratified_subsample(y: np.ndarray, n: int, seed: int) -> np.ndarray:
+    """Índices de uma amostra estratificada de ~n linhas (ao menos 1 por classe), em ordem crescente."""
+    rng = np.random.default_rng(seed)
+    classes, counts = np.unique(y, return_counts=True)
+    out = []
+    for c, cnt in zip(classes, counts):
+        take = min(int(cnt), max(1, int(round(n * cnt / len(y)))))
+        out.append(rng.choice(np.flatnonzero(y == c), size=take, replace=False))
+    return np.sort(np.concatenate(out))
+
+
+class StratifiedReservoir:
+    """
+    Amostragem por reservatório (Algoritmo R) independente por classe: cada classe guarda
+    no máximo `quota` linhas, uniformemente amostradas entre todas as vistas, em memória
+    limitada a quota x n_features x 4 bytes por classe (float32).
+    """
+
+    def __init__(self, n_features: int, quota: int, seed: int = 42):
+        if quota <= 0:
+            raise ValueError("quota por classe deve ser positiva.")
+        self.n_features = n_features
+        self.quota = int(quota)
+        self.rng = np.random.default_rng(seed)
+        self.buffers: Dict[Any, np.ndarray] = {}
+        self.seen: Dict[Any, int] = {}
+
+    def add(self, X: np.ndarray, y: np.ndarray) -> None:
+        classes, inv = np.unique(y, return_inverse=True)
+        for ci, cls in enumerate(classes):
+            cls = cls.item() if isinstance(cls, np.generic) else cls
+            rows = X[inv == ci]
+            buf = self.buffers.get(cls)
+            if buf is None:
+                buf = self.buffers[cls] = np.empty((self.quota, self.n_features), dtype=np.float32)
+            seen = self.seen.get(cls, 0)
+
+            # fase de preenchimento: as primeiras `quota` linhas entram direto
+            fill = max(0, min(self.quota - seen, rows.shape[0]))
+            if fill:
+                buf[seen:seen + fill] = rows[:fill]
+            rest = rows[fill:]
+            if rest.shape[0]:
+                # t-ésima linha (1-based) substitui o slot j ~ U[0, t) se j < quota
+                t = seen + fill + np.arange(1, rest.shape[0] + 1)
+                j = self.rng.integers(0, t)
+                hit = np.flatnonzero(j < self.quota)
+                if hit.size:
+                    # slots repetidos: vale a última substituição (mesma semântica do laço sequencial)
+                    slots = j[hit]
+                    _, last = np.unique(slots[::-1], return_index=True)
+                    keep = hit[::-1][last]
+                    buf[j[keep]] = rest[keep]
+            self.seen[cls] = seen + rows.shape[0]
+
+    def kept(self) -> Dict[Any, int]:
+        return {c: min(n, self.quota) for c, n in self.seen.items()}
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(X, y) com as linhas mantidas de todas as classes (ordem por classe)."""
+        classes = sorted(self.buffers, key=str)
+        kept = self.kept()
+        X = np.concatenate([self.buffers[c][:kept[c]] for c in classes], axis=0)
+        y = np.concatenate([np.full(kept[c], c, dtype=object) for c in classes])
+        return X, y
+
+
+def stratified_sample_csvs(
+    paths: Sequence[str | Path],
+    target_col: str,
+    features: List[str],
+    quota: int,
+    chunksize: int = 200_000,
+    seed: int = 42,
+) -> Tuple[pd.DataFrame, pd.Series, Dict[str, Dict[Any, int]]]:
+    """
+    Lê um ou mais CSVs em blocos (só `features` em float32 + alvo) e devolve uma amostra
+    estratificada com até `quota` linhas por classe, além das contagens vistas/mantidas por classe.
+    """
+    wanted = set(features) | {target_col}
+    res = StratifiedReservoir(len(features), quota, seed)
+    for path in paths:
+        reader = pd.read_csv(
+            path, usecols=lambda c: c in wanted, dtype={c: np.float32 for c in features}, chunksize=chunksize
+        )
+        for chunk in reader:
+            missing = [c for c in features if c not in chunk.columns]
+            if missing:
+                raise KeyError(f"Features ausentes em {path}: {missing}")
+            if target_col not in chunk.columns:
+                raise KeyError(f"target_col {target_col} não existe em {path}")
+            res.add(chunk[features].to_numpy(dtype=np.float32), chunk[target_col].to_numpy())
+        logger.info(f"Amostragem: {path} lido ({sum(res.seen.values())} linhas acumuladas)")
+
+    X, y = res.result()
+    # rótulos voltam ao tipo original (ex.: int no UNSW) quando possível
+    y = pd.Series(y, name=target_col).infer_objects()
+    stats = {"seen": dict(res.seen), "kept": res.kept()}
+    return pd.DataFrame(X, columns=features), y, stats